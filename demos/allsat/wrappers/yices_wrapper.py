@@ -1,12 +1,265 @@
-import os, tempfile
-from etb.wrapper import Tool, BatchTool, Substitutions, Success, Failure, Errors
-from etb.terms import mk_term
+import os, re, errno, shutil, subprocess, threading, atexit, itertools
+import multiprocessing, collections, weakref
+from multiprocessing.pool import ThreadPool
+from etb.wrapper import Tool, BatchTool, tool_path, Substitutions, Success, Failure, Errors
+from etb.terms import mk_term, mk_stringconst, mk_array
+
+# The empty list, bound by nil
+_NIL_TERM = mk_term([])
+
+# tail -> head -> result of cons, holding neither tails nor results
+_CONS_CACHE = weakref.WeakKeyDictionary()
+
+# Echoed after each batch of commands sent to the persistent yices
+# process, so that we know where its answer ends.
+_DONE = '--etb-yices-done--'
+
+# Number of answers remembered by Yices_batch.yices
+_QCACHE_SIZE = 4096
+
+# Files larger than this are copied by negateModel without being read
+# into memory, and their contents are not cached.
+_BASE_CACHE_LIMIT = 1 << 20
+
+# First line of a yices answer
+_STATUSES = ('sat', 'unsat', 'unknown')
+
+# Assertion added by negateModel around the model
+_NEG_PREFIX = '(assert (not (and '
+_NEG_SUFFIX = ')))'
+
+# Scripts fed to one-shot yices invocations
+_DRIVER = '(include "%s")\n(check)\n'
+_CUBE_DRIVER = '(include "%s")\n(assert %s)\n(check)\n'
+
+# Name of the files written by negateModel, numbered per process
+_SCRATCH = '_etb_allsat_%d_%d.ys'
+
+_BOOL_DEFINE = re.compile(r'\(define\s+([^\s:()]+)\s*::\s*bool\s*\)')
+
+def _copy_file(ic, fd, size):
+    '''
+    Copy the size bytes of the open file ic to the file descriptor fd.
+    '''
+    if hasattr(os, 'sendfile'):
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(fd, ic.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    else:
+        with os.fdopen(os.dup(fd), 'wb') as oc:
+            shutil.copyfileobj(ic, oc, 1 << 20)
+
+def _split_output(out):
+    '''
+    Split the output of yices into its status line and the model, whose
+    lines are joined together.
+    '''
+    nl = out.find('\n')
+    if nl < 0:
+        return (out, '')
+    return (out[:nl], out[nl+1:].translate(None, '\n'))
 
 class Yices_batch(BatchTool):
     '''
-    Simple subprocess interface for one-shot invocations of yices.
+    Subprocess interface to yices.  Formulas are checked on a
+    long-lived yices process: the files built by negateModel only add
+    an assertion to their input file, so following an allsat chain
+    only requires sending the new assertions to the solver.  One-shot
+    invocations are used if the persistent process fails.
     '''
 
+    def __init__(self, etb):
+        BatchTool.__init__(self, etb)
+        # sha1 of out_file -> (yices_file, sha1 of yices_file, assertion),
+        # filled in by negateModel
+        self._negations = {}
+        # sha1 of out_file -> contents of the files negateModel has
+        # just written, keyed like _negations
+        self._base_cache = {}
+        # sha1 -> output of yices, least recently used first
+        self._qcache = collections.OrderedDict()
+        self._qcache_lock = threading.Lock()
+        self._proc = None
+        self._proc_root = None
+        self._proc_asserts = []
+        self._proc_lock = threading.Lock()
+        # numbers the files written by negateModel
+        self._scratch_ids = itertools.count()
+        # workers for yices_many, created on first use
+        self._pool = None
+        atexit.register(self._close_proc)
+
+    def _chain(self, ref):
+        '''
+        Returns the file the file ref was derived from by negateModel,
+        as a (file, sha1) pair, and the assertions that were added
+        along the way.  Files are followed by content, so that a root
+        file whose contents changed starts a new chain.
+        '''
+        (yices_file, sha1) = (ref['file'], ref['sha1'])
+        asserts = []
+        while sha1 in self._negations:
+            (yices_file, sha1, assertion) = self._negations[sha1]
+            asserts.append(assertion)
+        asserts.reverse()
+        return ((yices_file, sha1), asserts)
+
+    def _ensure_proc(self, root, asserts):
+        '''
+        Make sure the persistent process has included the root
+        (file, sha1) pair and asserted a prefix of asserts, restarting
+        it otherwise.  Returns the assertions that remain to be sent.
+        '''
+        done = self._proc_asserts
+        if (self._proc is None or self._proc.poll() is not None
+            or self._proc_root != root or asserts[:len(done)] != done):
+            self._close_proc()
+            self._proc = subprocess.Popen([tool_path('yices'), '-e'],
+                                          close_fds=False,
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.STDOUT)
+            self._proc_root = root
+            self._proc_asserts = []
+            self._send('(include "%s")' % root[0])
+        return asserts[len(self._proc_asserts):]
+
+    def _send(self, cmd, proc=None):
+        (proc or self._proc).stdin.write(cmd + '\n')
+
+    def _read_until_prompt(self, proc=None):
+        '''
+        Returns what yices printed for the commands sent so far.
+        '''
+        proc = proc or self._proc
+        self._send('(echo "%s\\n")' % _DONE, proc)
+        lines = []
+        for line in iter(proc.stdout.readline, ''):
+            if line.rstrip('\n') == _DONE:
+                return ''.join(lines)
+            lines.append(line)
+        raise IOError('yices exited: %s' % ''.join(lines))
+
+    def _close_proc(self):
+        if self._proc is not None:
+            try:
+                if self._proc.poll() is None:
+                    self._send('(exit)')
+                    self._proc.stdin.close()
+                    self._proc.wait()
+            except (IOError, OSError):
+                pass
+            self._proc = None
+
+    def _new_scratch(self):
+        '''
+        Create a new file for negateModel, returning its descriptor and
+        name.  The files of an allsat chain must keep distinct names
+        (they are recorded in _negations and in git), but counting them
+        avoids the random names and retries of tempfile.mkstemp.
+        '''
+        while True:
+            name = _SCRATCH % (os.getpid(), next(self._scratch_ids))
+            try:
+                fd = os.open(name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                return (fd, name)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def _check_incremental(self, formula):
+        '''
+        Check the file ref formula on the persistent process.  Returns
+        the status and model, or None if yices did not answer.
+        '''
+        (root, asserts) = self._chain(formula)
+        with self._proc_lock:
+            try:
+                for assertion in self._ensure_proc(root, asserts):
+                    self._send(assertion)
+                    self._proc_asserts.append(assertion)
+                self._send('(check)')
+                output = _split_output(self._read_until_prompt())
+            except (IOError, OSError) as msg:
+                self.log.error('yices: persistent process failed: {0}'.format(msg))
+                self._close_proc()
+                return None
+            if output[0] not in _STATUSES:
+                self.log.error('yices: unexpected output {0}'.format(output))
+                self._close_proc()
+                return None
+            return output
+
+    def _check_once(self, script):
+        '''
+        Run script on a one-shot yices process and return the status and
+        model.  The process is stopped as soon as the status is known
+        when there is no model to read.
+        '''
+        proc = subprocess.Popen([tool_path('yices'), '-e'],
+                                close_fds=False,
+                                stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        proc.stdin.write(script)
+        proc.stdin.close()
+        status = proc.stdout.readline().rstrip('\n')
+        if status in ('unsat', 'unknown'):
+            proc.terminate()
+            rest = ''
+        else:
+            rest = proc.stdout.read()
+        proc.stdout.close()
+        proc.wait()
+        return (status, rest.translate(None, '\n'))
+
+    def _check_cube(self, yices_file, cube):
+        '''
+        Check yices_file under the assumption cube on its own yices
+        process.  Returns the status and model, or None on error.
+        '''
+        output = self._check_once(_CUBE_DRIVER % (yices_file, cube))
+        if output[0] not in _STATUSES:
+            self.log.error(' '.join(output))
+            return None
+        return output
+
+    def _check_cubes(self, yices_file, cubes):
+        '''
+        Check yices_file under each of the assumption cubes on a single
+        yices process, so that yices_file is only parsed once.  Returns
+        the statuses and models, or None on error.
+        '''
+        proc = subprocess.Popen([tool_path('yices'), '-e'],
+                                close_fds=False,
+                                stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        outputs = []
+        try:
+            self._send('(include "%s")' % yices_file, proc)
+            for cube in cubes:
+                self._send('(push)', proc)
+                self._send('(assert %s)' % cube, proc)
+                self._send('(check)', proc)
+                output = _split_output(self._read_until_prompt(proc))
+                self._send('(pop)', proc)
+                if output[0] not in _STATUSES:
+                    self.log.error('yices: unexpected output {0}'.format(output))
+                    return None
+                outputs.append(output)
+            return outputs
+        except (IOError, OSError) as msg:
+            self.log.error('yices: cube process failed: {0}'.format(msg))
+            return None
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+
     # @Tool.predicate("+left: value, +right: value")
     # def equal(self, left, right):
     #     if left == right:
@@ -17,16 +270,24 @@ class Yices_batch(BatchTool):
     @Tool.predicate("-out: value")
     def nil(self, v):
         if v.is_var():
-            return Substitutions(self, [ {v: mk_term([])} ])
+            return Substitutions(self, [ {v: _NIL_TERM} ])
         else:
             return Errors(self, ["nil: checking not supported"])
     
     @Tool.predicate("+head: value, +tail: value, -out: value")
     def cons(self, head, tail, out):
-        if tail.is_const() and tail.val is None:
-            res = [head]
-        else:
-            res = [head.val] + list(tail.get_args())
+        conses = _CONS_CACHE.get(tail)
+        if conses is None:
+            conses = _CONS_CACHE[tail] = weakref.WeakValueDictionary()
+        res = conses.get(head)
+        if res is None:
+            if tail.is_const() and tail.val is None:
+                res = mk_term([head])
+            else:
+                # The tail is already a tuple of terms: only the head
+                # needs converting.
+                res = mk_array((mk_term(head.val),) + tail.get_args())
+            conses[head] = res
         return Substitutions(self, [self.bindResult(out, res)])
     
     @Tool.predicate("+yices_file: file, +model: value, -out: file")
@@ -35,36 +296,100 @@ class Yices_batch(BatchTool):
         Create a new yices file containing the input yices files and
         asserting the negation of the model.
         '''
-        with tempfile.NamedTemporaryFile(delete=False, dir='.') as oc:
-            out_file = os.path.basename(oc.name)
-            with open(yices_file['file'], 'r') as ic:
-                for line in ic:
-                    print >>oc, line
-            print >>oc, '(assert (not (and %s)))' % str(model)
-        outref = self.fs.put_file(out_file)
+        assertion = _NEG_PREFIX + str(model) + _NEG_SUFFIX
+        base = self._base_cache.pop(yices_file['sha1'], None)
+        (fd, out_file) = self._new_scratch()
+        if base is None:
+            with open(yices_file['file'], 'rb') as ic:
+                size = os.fstat(ic.fileno()).st_size
+                if size < _BASE_CACHE_LIMIT:
+                    base = ic.read()
+                else:
+                    _copy_file(ic, fd, size)
+        if base is not None:
+            os.write(fd, base)
+        os.write(fd, assertion + '\n')
+        os.close(fd)
+        outref = self.fs.put_file(out_file, commit=False)
+        self._negations[outref['sha1']] = (yices_file['file'], yices_file['sha1'], assertion)
+        if base is not None and len(base) < _BASE_CACHE_LIMIT:
+            self._base_cache[outref['sha1']] = base + assertion + '\n'
         return Substitutions(self, [self.bindResult(out, outref)])
 
     @Tool.predicate("+formula: file, -result: value, -model: value")
     def yices(self, formula, result, model):
-        with tempfile.NamedTemporaryFile(delete=False, dir='.') as oc:
-            new_file = os.path.basename(oc.name)
-            print >>oc, '(include "%s")' % formula['file']
-            print >>oc, '(check)'
-        (ret, out, err) = self.callTool('yices', '-e', new_file)
-        if ret != 0:
-            self.log.error(err)
-            return Errors(self, ['error("yices", "%s")' % err])
-        output = out.split('\n')
-        if output[0] == 'sat':
-            s = self.bindResult(result, output[0])
-            s = self.bindResult(model, ''.join(output[1:]), current=s)
+        with self._qcache_lock:
+            output = self._qcache.pop(formula['sha1'], None)
+        if output is None:
+            output = self._check_incremental(formula)
+        if output is None:
+            output = self._check_once(_DRIVER % formula['file'])
+            if output[0] not in _STATUSES:
+                err = ' '.join(output)
+                self.log.error(err)
+                return Errors(self, ['error("yices", "%s")' % err])
+        with self._qcache_lock:
+            self._qcache[formula['sha1']] = output
+            if len(self._qcache) > _QCACHE_SIZE:
+                self._qcache.popitem(last=False)
+        (status, found) = output
+        if status == 'sat':
+            s = self.bindResult(result, status)
+            # The model is already a byte string: do not let mk_term
+            # guess its type.
+            s = self.bindResult(model, mk_stringconst(found), current=s)
         else:
-            s = self.bindResult(result, output[0])
+            s = self.bindResult(result, status)
             s = self.bindResult(model, [], current=s)
         if s == []:
             return Failure(self)
         else:
             return Substitutions(self, [s])
+
+    @Tool.predicate("+formula: file, +k: value, -out: value")
+    def cubes(self, formula, k, out):
+        '''
+        Split formula on its first k boolean variables: returns the
+        2^k cubes assigning them, to be passed to yices_many.
+        '''
+        with open(formula['file'], 'r') as ic:
+            names = _BOOL_DEFINE.findall(ic.read())[:int(k.val)]
+        res = []
+        for signs in itertools.product((True, False), repeat=len(names)):
+            lits = [n if pos else '(not %s)' % n for (n, pos) in zip(names, signs)]
+            if len(lits) == 0:
+                res.append('true')
+            elif len(lits) == 1:
+                res.append(lits[0])
+            else:
+                res.append('(and %s)' % ' '.join(lits))
+        return Substitutions(self, [self.bindResult(out, res)])
+
+    @Tool.predicate("+formula: file, +cubes: value, -models: value")
+    def yices_many(self, formula, cubes, models):
+        '''
+        Check formula under each of the assumption cubes, and return
+        the models found.  The cubes are shared out between one yices
+        process per cpu, each of which parses formula once; a share is
+        checked one cube per process if its yices process fails.
+        '''
+        ncpus = multiprocessing.cpu_count()
+        with self._proc_lock:
+            if self._pool is None:
+                self._pool = ThreadPool(ncpus)
+        cubes = [c.val for c in cubes.get_args()]
+        n = min(len(cubes), ncpus)
+        def check_share(share):
+            outputs = self._check_cubes(formula['file'], share)
+            if outputs is None:
+                outputs = [self._check_cube(formula['file'], c) for c in share]
+            return outputs
+        shares = self._pool.map(check_share, [cubes[i::n] for i in range(n)])
+        outputs = [o for share in shares for o in share]
+        if any(o is None for o in outputs):
+            return Errors(self, ['yices_many: yices failed'])
+        found = [m for (status, m) in outputs if status == 'sat']
+        return Substitutions(self, [self.bindResult(models, found)])
     
 def register(etb):
     "Register the tool"
@@ -1,6 +1,12 @@
-import os, tempfile
+import os, tempfile, weakref
 from etb.wrapper import Tool, BatchTool
-from etb.terms import mk_term
+from etb.terms import mk_term, mk_array
+
+# The empty list, bound by nil
+_NIL_TERM = mk_term([])
+
+# tail -> head -> result of cons, holding neither tails nor results
+_CONS_CACHE = weakref.WeakKeyDictionary()
 
 class List_batch(BatchTool):
     '''
@@ -9,7 +15,9 @@ class List_batch(BatchTool):
 
     @Tool.predicate("+left: value, +right: value")
     def equal(self, left, right):
-        if left == right:
+        # Terms are hashconsed, and == compares their (cached) hashes
+        # before their structure.
+        if left is right or left == right:
             return [{}]
         else:
             return []
@@ -17,16 +25,24 @@ class List_batch(BatchTool):
     @Tool.predicate("-out: value")
     def nil(self, v):
         if v.is_var():
-            return [ {v: mk_term([])} ]
+            return [ {v: _NIL_TERM} ]
         else:
             return { 'claims' : 'error("nil", "checking not supported")'}
     
     @Tool.predicate("+head: value, +tail: value, -out: value")
     def cons(self, head, tail, out):
-        if tail.is_const() and tail.val is None:
-            res = [head]
-        else:
-            res = [head.val] + list(tail.get_args())
+        conses = _CONS_CACHE.get(tail)
+        if conses is None:
+            conses = _CONS_CACHE[tail] = weakref.WeakValueDictionary()
+        res = conses.get(head)
+        if res is None:
+            if tail.is_const() and tail.val is None:
+                res = mk_term([head])
+            else:
+                # The tail is already a tuple of terms: only the head
+                # needs converting.
+                res = mk_array((mk_term(head.val),) + tail.get_args())
+            conses[head] = res
         return [self.bindResult(out, res)]
     
     
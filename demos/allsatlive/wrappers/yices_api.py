@@ -3,6 +3,8 @@ import os
 import sys
 
 import ctypes
+import logging
+import mmap
 import tempfile
 import re
 
@@ -41,11 +43,23 @@ libyices.yices_check.argtypes = [ctypes.c_void_p]
 libyices.yices_get_arith_value_as_string.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
 libyices.yices_free_string.argtypes = [ctypes.c_void_p]
 libyices.yices_evaluate_in_model.argtypes = [ctypes.c_void_p, ctypes.c_void_p]#model, bool_expr
-libyices.yices_evaluate_in_model.restypes = ctypes.c_int #returns -1(false), 0 (undef), 1 (true)
+libyices.yices_evaluate_in_model.restype = ctypes.c_int #returns -1(false), 0 (undef), 1 (true)
+
+#Entry points called for every command or model value, looked up once
+_parse_command = libyices.yices_parse_command
+_check = libyices.yices_check
+_get_model = libyices.yices_get_model
+_get_value = libyices.yices_get_value
+_get_arith_value = libyices.yices_get_arith_value_as_string
+_free_string = libyices.yices_free_string
+_get_last_error_message = libyices.yices_get_last_error_message
 
 # Nice output formatting for functions returning lbool in C API
-yices_lbool_results = ['unsat', 'unknown', 'sat']
-yices_lbool_model_vals = ['false', 'dont care', 'true']
+yices_lbool_results = ('unsat', 'unknown', 'sat')
+yices_lbool_model_vals = ('false', 'dont care', 'true')
+
+# Types of the variables whose values are read back from models
+yices_atomic_types = frozenset(('bool', 'int', 'nat', 'real'))
 
 class counter:
     def __init__(self):
@@ -67,92 +81,129 @@ def yices_enable_type_checker(flag):
     else:
         libyices.yices_enable_type_checker(0)
 
-#Defines grammar for reading yices files; used in the include <file> api for yices.
-from pyparsing import *
-
-#Grammar for s-expressions which is used to parse Yices expressions
-token = Word(alphanums + "-./_:*+=!<>")
+#Parser for reading yices files; used in the include <file> api for yices.
+#Files are split into their top-level commands by only looking at their
+#parentheses and comments.  The commands that need to be taken apart are
+#read in a single pass over their tokens, building s-expressions with an
+#explicit stack instead of a backtracking grammar.
 
 LPAR = "("
 RPAR = ")"
 
+commandDelimiter = re.compile(r';[^\n]*|[()]')
+commandAction = re.compile(r'\(\s*([^\s();]+)')
+
+def splitCommands(text):
+    '''Returns the commands in text as triples (action, command, args),
+    where command is the text of the command and args the text following
+    its action.'''
+    commands = []
+    depth = 0
+    for m in commandDelimiter.finditer(text):
+        delimiter = m.group()
+        if delimiter == LPAR:
+            if depth == 0:
+                start = m.start()
+            depth += 1
+        elif delimiter == RPAR:
+            if depth == 0:
+                raise ValueError('Unbalanced %s' % RPAR)
+            depth -= 1
+            if depth == 0:
+                command = text[start:m.end()]
+                action = commandAction.match(command)
+                if action is None:
+                    raise ValueError('Not a yices command: %s' % command)
+                commands.append((action.group(1), command, command[action.end():-1]))
+    if depth > 0:
+        raise ValueError('Missing %s' % RPAR)
+    return commands
+
+def includeCommands(file):
+    '''Returns the commands in file as splitCommands does.  The file is
+    mapped rather than read, so that only the text of the commands is
+    copied.'''
+    with open(file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return splitCommands(text)
+    finally:
+        text.close()
+
 #Yices comments are ignored; parentheses are retained since Yices expressions are printed back
 #as strings for the Yices api
-lispStyleComment = Group(";" + restOfLine)
-
-sexp = Forward()
-
-sexpList = ZeroOrMore(sexp)
-sexpList.ignore(lispStyleComment)
-
-sexpGroup =  Group(LPAR + sexpList + RPAR)
-
-sexp << (token | sexpGroup)
-
-#Grammar for Yices commands
-
-#_LPAR = Suppress(LPAR)
-#_RPAR = Suppress(RPAR)
-
-#The command names are enumerated
-
-yDefine = Literal("define")
-yAssert = Literal("assert")
-yAssertPlus = Literal("assert+")
-yRetract = Literal("retract")
-yCheck = Literal("check")
-yMaxSat = Literal("maxsat")
-ySetEvidence = Literal("set-evidence!")
-ySetVerbosity = Literal("set-verbosity")
-ySetArithOnly = Literal("set-arith-only")
-yPush = Literal("push")
-yPop = Literal("pop")
-yEcho = Literal("echo")
-yReset = Literal("reset")
-
-yCommandName = yDefine + yAssert + yAssertPlus + yRetract + yCheck + yMaxSat + ySetEvidence + ySetVerbosity + ySetArithOnly + yPush + yPop + yEcho + yReset
-
-#name is word without colons
-name = Word(alphanums + "-./_*+=!<>")
-colons = Suppress("::")
-
-#Define commands are treated differently since we have to parse out the '::'
-yDefineCommand = Group(yDefine + name + colons + sexp + sexpList)
-
-yOtherCommandName = yAssert | yAssertPlus | yRetract | yCheck | yMaxSat | ySetEvidence | ySetVerbosity | ySetArithOnly | yPush | yPop | yEcho | yReset
-
-yOtherCommand = Group(yOtherCommandName + sexpList)
-
-yCommandBody = yDefineCommand | yOtherCommand
-
-yCommand = Group(LPAR +  yCommandBody + RPAR)
-
-yCommandList = ZeroOrMore(yCommand)
-
-yCommandList.ignore(lispStyleComment)
-
-
-# no longer used: defineName = Group(name + colons + sexp + sexpList)
-
-lparPrint = " ("
-rparPrint = ") "
+sexpToken = re.compile(r';[^\n]*|[()]|[^\s();]+')
+
+def parseSexps(text):
+    '''Returns the list of s-expressions in text.  A group is the list of
+    its elements, starting with LPAR and ending with RPAR.'''
+    top = []
+    stack = [top]
+    for token in sexpToken.findall(text):
+        if token == LPAR:
+            group = [LPAR]
+            stack[-1].append(group)
+            stack.append(group)
+        elif token == RPAR:
+            if len(stack) == 1:
+                raise ValueError('Unbalanced %s' % RPAR)
+            stack.pop().append(RPAR)
+        elif token[0] != ';':
+            stack[-1].append(token)
+    if len(stack) > 1:
+        raise ValueError('Missing %s' % RPAR)
+    return top
+
+def parseDefine(body):
+    '''Splits the '::' out of the body of a define command, which may be
+    written "a::bool", "a ::bool", "a:: bool" or "a :: bool".'''
+    if len(body) < 2 or not isinstance(body[1], str):
+        raise ValueError('Missing name in define')
+    (name, colons, type) = body[1].partition('::')
+    rest = body[2:]
+    if not colons and rest and isinstance(rest[0], str):
+        (_, colons, type) = rest.pop(0).partition('::')
+    if not colons:
+        raise ValueError('Missing :: in define of %s' % name)
+    if not type:
+        if not rest:
+            raise ValueError('Missing type in define of %s' % name)
+        type = rest.pop(0)
+    return [body[0], intern(name), type] + rest
+
+def parseCommands(text):
+    '''Returns the yices commands in text.  Each command is a list
+    [LPAR, body, RPAR], where body is the command name followed by its
+    arguments.'''
+    commands = []
+    for sexp in parseSexps(text):
+        if not isinstance(sexp, list) or len(sexp) < 3:
+            raise ValueError('Not a yices command: %s' % sexp)
+        body = sexp[1:-1]
+        if body[0] == 'define':
+            body = parseDefine(body)
+        commands.append([LPAR, body, RPAR])
+    return commands
 
 def printSexp(parsedSexp):
-    if parsedSexp == LPAR:
-        return lparPrint
-    elif parsedSexp == RPAR:
-        return rparPrint
-    elif type(parsedSexp) == str:
-        return parsedSexp
-    elif parsedSexp == []:
-        return ''
-    else:
-        first = printSexp(parsedSexp[0])
-        rest = printSexp(parsedSexp[1:])
-        if (first == lparPrint) or (first == rparPrint) or (rest == rparPrint):
-            return '%s%s' % (first, rest)
-        else: 
-            return '%s %s' % (first, rest)
+    '''Prints a parsed s-expression back as a string.  The expression is
+    walked with an explicit stack, so that printing is linear in its size
+    and does not recurse.'''
+    out = []
+    stack = [iter([parsedSexp])]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, basestring):
+            if out and node != RPAR and out[-1] != LPAR:
+                out.append(' ')
+            out.append(node)
+        else:
+            stack.append(iter(node))
+    return ''.join(out)
 
 class YicesContextManager(object):
     """  A context manager for Yices that encapsulates the operations on a context.  """
@@ -161,6 +212,7 @@ class YicesContextManager(object):
         """
         Creates a fresh context.
         """
+        self.log = logging.getLogger('etb.wrapper')
         self.libyices = libyices
         self.context = self.libyices.yices_mk_context()
         self.allvars = []
@@ -177,13 +229,16 @@ class YicesContextManager(object):
         yices_del_context(self.context)
         
     def yices_command(self, command):
-        """Manager utility for executing a command. """
-        return self.libyices.yices_parse_command(self.context, command)
+        """Manager utility for executing a command.  The error message is
+        only fetched from yices when the command fails."""
+        result = _parse_command(self.context, command)
+        if result == 0:
+            self.last_error_msg = _get_last_error_message()
+        return result
 
     def yices_set_last_error_msg(self, msg):
         """The field last_error_msg records the last error message."""
         self.last_error_msg = msg
-        print(msg)
 
     def yices_get_last_error_msg(self):
         """Method for accessing the last error message. """
@@ -191,18 +246,20 @@ class YicesContextManager(object):
         
     def yices_define(self, var, type, body=None):
         """Method for adding a definition of var of type with optional body.
-        The command is appended to command, and var is appended to allvars."""
+        The command is appended to command, and var is appended to allvars
+        together with its type and declaration."""
         if body:
-            command = '(define %s::%s %s)' % (var, type, body)
+            command = ''.join(('(define ', var, '::', type, ' ', body, ')'))
         else:
-            command = '(define %s::%s)' % (var, type)
-        result = self.libyices.yices_parse_command(self.context, command)
+            command = ''.join(('(define ', var, '::', type, ')'))
+        result = _parse_command(self.context, command)
         if result == 0:
-            self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
+            self.yices_set_last_error_msg(_get_last_error_message())
         else:
             self.commands.append(command)
-            if type in ['bool', 'int', 'nat', 'real']:
-                self.allvars.append((var, type))
+            if type in yices_atomic_types:
+                vdecl = self.libyices.yices_get_var_decl_from_name(self.context, var)
+                self.allvars.append((var, type, vdecl))
         return result
 
     def version(self):
@@ -211,14 +268,14 @@ class YicesContextManager(object):
 
     def yices_assert_plus(self, formula):
         """retractable assertion of formula.  (No support for retraction yet.)"""
-        yicesexpr = libyices.yices_parse_expression(self.context,yformula);
+        yicesexpr = libyices.yices_parse_expression(self.context, formula)
         if yicesexpr:
             result = self.libyices.yices_assert_retractable(self.context, yicesexpr)
             if result == 0:
-                self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
+                self.yices_set_last_error_msg(_get_last_error_message())
                 return result
             else:
-                self.commands.append('(assert+ %s)' % formula)
+                self.commands.append(''.join(('(assert+ ', formula, ')')))
                 return result
         else:
             return 0
@@ -226,65 +283,89 @@ class YicesContextManager(object):
     def yices_include_define(self, parseDefineBody):
         """Utility for parsing and adding a definition from an included file.
         """
-        #print('parseDefineBody = %s' % parseDefineBody)
+        #self.log.debug('parseDefineBody = %s', parseDefineBody)
         
         if (len(parseDefineBody) < 3):
-            result = self.yices_define(parseDefineBody[0], parseDefineBody[1])
+            result = self.yices_define(parseDefineBody[0], printSexp(parseDefineBody[1]))
             return result
         else:
-            result = self.yices_define(parseDefineBody[0], parseDefineBody[1],
+            result = self.yices_define(parseDefineBody[0], printSexp(parseDefineBody[1]),
                                        printSexp(parseDefineBody[2]))
             return result
         
 
 
+    def yices_include_asserts(self, asserts):
+        '''Utility for sending the (command, formula) pairs of asserts from an
+        included file with a single call to yices, by asserting the
+        conjunction of the formulas.
+        '''
+        if not asserts:
+            return 1
+        elif len(asserts) == 1:
+            command = asserts[0][0]
+        else:
+            command = ''.join(('(assert (and', '\n'.join(f for (_, f) in asserts), '))'))
+        result = self.yices_command(command)
+        if result != 0:
+            self.commands.append(command)
+        return result
+
     def yices_include(self, file):
-        '''Executes an (include <file>) command by parsing the individual commands.
-        The commands define, push, and pop need special treatment since they affect the
-        context.  The other commands are processed by yices_command.  '''
-        #print('file = %s' % file)
-        parsedFile = yCommandList.parseFile(file)
-        for parseIn in parsedFile:
-            #print('parseIn = %s' % parseIn)
-            body = parseIn[1]
-            action = body[0]  #action is the second element following lparen
+        '''Executes an (include <file>) command by splitting it into the individual
+        commands.  The commands define, push, and pop need special treatment since they
+        affect the context.  Consecutive asserts are sent together by
+        yices_include_asserts, and the text of the other commands is processed by
+        yices_command.  '''
+        #self.log.debug('file = %s', file)
+        asserts = []
+        for (action, command, args) in includeCommands(file):
+            #self.log.debug('command = %s', command)
+            if action == 'assert':
+                asserts.append((command, args))
+                continue
+            if self.yices_include_asserts(asserts) == 0:
+                return 0
+            asserts = []
             if action == 'define':
-                self.yices_include_define(body[1:]) #-1 removes last paren
+                body = parseCommands(command)[0][1]
+                self.yices_include_define(body[1:])
             elif action == 'push':
                 self.yices_push()
             elif action == 'pop':
                 self.yices_pop()
+            elif action == 'reset':
+                self.yices_reset()
             else: 
-                command = printSexp(parseIn)
                 result = self.yices_command(command)
                 if result == 0:
-                    self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
                     return result
                 else:
                     self.commands.append(command)
-                    return result
+        return self.yices_include_asserts(asserts)
 
     def yices_push(self):
         ''' Utility for pushing the scope in a context.'''
-        result = self.libyices.yices_parse_command(self.context, '(push)')
+        result = _parse_command(self.context, '(push)')
         if result == 0:
-            self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
+            self.yices_set_last_error_msg(_get_last_error_message())
             return result
         else:
-            self.commands_stack.append(self.commands.length())
-            self.allvars_stack.append(self.allvars.length())
+            self.commands_stack.append(len(self.commands))
+            self.allvars_stack.append(len(self.allvars))
             return result
 
     def yices_pop(self):
-        """Method for applying the pop command and updating the commands field."""
-        if self.commands_stack.length() == 0:
-            result = self.libyices.yices_parse_command(self.context, '(pop)')
+        """Method for applying the pop command and updating the commands
+        and allvars fields."""
+        if self.commands_stack:
+            result = _parse_command(self.context, '(pop)')
             if result == 0:
-                self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
+                self.yices_set_last_error_msg(_get_last_error_message())
                 return result
             else:
-                top = self.commands_stack.pop()
-                self.commands = self.commands[:top]
+                del self.commands[self.commands_stack.pop():]
+                del self.allvars[self.allvars_stack.pop():]
                 return result
         else:
             self.yices_set_last_error_msg('No corresponding push.')
@@ -293,9 +374,9 @@ class YicesContextManager(object):
 
     def yices_reset(self):
         '''Applies (reset) command to the yices context and local fields.'''
-        result = self.libyices.yices_parse_command(self.context, '(reset)')
+        result = _parse_command(self.context, '(reset)')
         if result == 0:
-            self.yices_set_last_error_msg(self.libyices.yices_get_last_error_message())
+            self.yices_set_last_error_msg(_get_last_error_message())
             return result
         else: #clear the context
             self.commands = []
@@ -306,7 +387,7 @@ class YicesContextManager(object):
 
     def yices_check(self):
         """Method for checking consistency. Returns sat, unsat, or unknown."""
-        result = self.libyices.yices_check(self.context)
+        result = _check(self.context)
         return yices_lbool_results[result + 1]
 
     def yices_inconsistent(self):
@@ -320,22 +401,25 @@ class YicesContextManager(object):
         is available, retrieve the values for atomic variables.'''
         assignment = {}
         if not self.yices_inconsistent():
-            ymodel = self.libyices.yices_get_model(self.context)
-            print('allvars: %s' % self.allvars)
+            ymodel = _get_model(self.context)
+            self.log.debug('allvars: %s', self.allvars)
             if ymodel != None:
-                for variable, type in self.allvars:
-                    if (varlist == []) | (variable in varlist):
-                        vdecl = self.libyices.yices_get_var_decl_from_name(self.context, variable)
+                #A single srec_t receives the arithmetic values
+                arith = srec_t()
+                arith_ref = ctypes.byref(arith)
+                wanted = set(varlist)
+                for variable, type, vdecl in self.allvars:
+                    if not wanted or variable in wanted:
                         if type == 'bool' :
-                            val = self.libyices.yices_get_value(ymodel, vdecl)
+                            val = _get_value(ymodel, vdecl)
                             if val != 0:
                                 assignment[variable] = yices_lbool_model_vals[val + 1] #turns val into an lbool
                         else:
-                            val = srec_t();
-                            self.libyices.yices_get_arith_value_as_string(ymodel,vdecl,ctypes.byref(val))
-                            if val.flag != 0:
-                                assignment[variable] = val.str;
-                                self.libyices.yices_free_string(ctypes.byref(val))
+                            arith.flag = 0
+                            _get_arith_value(ymodel, vdecl, arith_ref)
+                            if arith.flag != 0:
+                                assignment[variable] = arith.str
+                                _free_string(arith_ref)
             else:
                 self.yices_set_last_error_msg('No model available. Call check() first')
         else:
@@ -344,7 +428,23 @@ class YicesContextManager(object):
 
 from etb.wrapper import Tool, InteractiveTool
 from etb.terms import mk_term
-from etb.terms import Term
+from etb.terms import Term, Const
+
+#Pieces of the commands built by YicesLibrary
+_ASSERT = '(assert '
+_ASSERT_NOT = '(assert (not '
+
+def yicesText(term):
+    '''Returns the yices text of a term given to a predicate as a byte
+    string.  The text of a constant is its value: formatting the term
+    would quote string constants and give a unicode string.'''
+    if isinstance(term, Const):
+        text = term.val
+    else:
+        text = repr(term)
+    if isinstance(text, unicode):
+        return text.encode('utf8')
+    return text
 
 class YicesLibrary(InteractiveTool):
     """ETB wrapper for yices"""
@@ -355,15 +455,22 @@ class YicesLibrary(InteractiveTool):
         Create a dynamically linked library, bind it to library, and
         call the parent initialization method.
         '''
-        print('Initializing YicesLibrary')
         InteractiveTool.__init__(self, etb)
+        self.log.debug('Initializing YicesLibrary')
+
+    def _mgr(self, sessionIn):
+        '''
+        Returns the context manager of the session of sessionIn, failing
+        if the handle is stale.
+        '''
+        return self._sessions[self.session_id(sessionIn)]['manager']
 
     @Tool.volatile    
     @Tool.predicate("-Version:value")
     def yicesVersion(self, version):
-        print('finding version')
+        self.log.debug('finding version')
         result = libyices.yices_version()
-        print('found version')
+        self.log.debug('found version')
         return [{version: mk_term(result)}]
 
     @Tool.predicate("-Session:handle")
@@ -374,7 +481,7 @@ class YicesLibrary(InteractiveTool):
         core, assignment is the model, and stack is the length of the decls
         at the point of the more recently scoped push.  
         """
-        print('yicesStart: entry')        
+        self.log.debug('yicesStart: entry')        
         sessionOut = self.add_session('yices', {'manager': YicesContextManager(), 'timestamp': 0})
         return [{session: mk_term(sessionOut)}]
 
@@ -393,9 +500,7 @@ class YicesLibrary(InteractiveTool):
         yices_parse_command, and if the result is non-0, then update session_info,
         update the timestamp with tick, and return a new session handle.
         '''
-        sid = self.session_id(sessionIn) #checks validity of sessionIn
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        mgr = self._mgr(sessionIn)
         result = mgr.yices_command(command)
         if result == 0:  #yices_command can return 1 on type error, so this is wrong
             self.fail(mgr.yices_get_last_error_msg())
@@ -409,11 +514,10 @@ class YicesLibrary(InteractiveTool):
         yices_define, and if the result is non-0, then update session_info,
         update the timestamp with tick, and return a new session handle.
         '''
-        sid = self.session_id(sessionIn) #checks validity of sessionIn
-        s_entry = self.session(sid)
-        libyices = self.library
-        mgr = s_entry['manager']
-        result = mgr.yices_define(var, type, body)
+        mgr = self._mgr(sessionIn)
+        if body is not None:
+            body = yicesText(body)
+        result = mgr.yices_define(yicesText(var), yicesText(type), body)
         if result == 0:
             self.fail(mgr.yices_get_last_error_msg())
         else:
@@ -425,7 +529,7 @@ class YicesLibrary(InteractiveTool):
     def yicesDeclare(self, sessionIn, var, type, sessionOut):
         ''' Define a variable.  If "body is not "None" the variable
         will become a yices macro.  "var", "type" have to be in yices syntax.'''
-        print('yicesDeclare: entry')        
+        self.log.debug('yicesDeclare: entry')        
         result = self.yices_define(sessionIn, var, type)
         return [{sessionOut: mk_term(result)}]
 
@@ -433,7 +537,7 @@ class YicesLibrary(InteractiveTool):
     def yicesDefine(self, sessionIn, var, type, body, sessionOut):
         ''' Define a variable.  "var", "type", and 
         "body" have to be in yices syntax.'''
-        print('yicesDefine: entry')        
+        self.log.debug('yicesDefine: entry')        
         result = self.yices_define(sessionIn, var, type, body)
         return [{sessionOut: mk_term(result)}]
 
@@ -441,8 +545,8 @@ class YicesLibrary(InteractiveTool):
     def yicesAssert(self, sessionIn, formula, sessionOut):
         ''' Assert formula into a logical context.  Input has to be in
         yices format.  '''
-        print('yicesAssert: entry')
-        command = '(assert %s)' % formula
+        self.log.debug('yicesAssert: entry')
+        command = _ASSERT + yicesText(formula) + ')'
         result = self.yices_command(sessionIn, command)
         return [{sessionOut: mk_term(result)}]
 
@@ -450,20 +554,18 @@ class YicesLibrary(InteractiveTool):
     def yicesAssertNegation(self, sessionIn, formula, sessionOut):
         ''' Assert formula into a logical context.  Input has to be in
         yices format.  '''
-        print('yicesAssertNegation: entry')
-        command = '(assert (not %s))' % formula
-        print('command: %s' % command)
+        self.log.debug('yicesAssertNegation: entry')
+        command = _ASSERT_NOT + yicesText(formula) + '))'
+        self.log.debug('command: %s', command)
         result = self.yices_command(sessionIn, command)
-        print('after yices_command')
+        self.log.debug('after yices_command')
         return [{sessionOut: mk_term(result)}]
 
     @Tool.predicate("+SessionIn:handle, +Formula:value, -SessionOut:handle")
     def yicesAssertPlus(self, sessionIn, formula, sessionOut):
-        print('yicesAssertPlus: entry')        
-        sid = self.session_id(sessionIn)
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
-        yid = mgr.yices_assert_plus(formula)
+        self.log.debug('yicesAssertPlus: entry')        
+        mgr = self._mgr(sessionIn)
+        yid = mgr.yices_assert_plus(yicesText(formula))
         if yid != 0:
             session_out = self.tick(sessionIn)
             return [{sessionOut: mk_term(session_out)}]
@@ -472,17 +574,13 @@ class YicesLibrary(InteractiveTool):
 
     @Tool.predicate("+SessionIn:handle, +File:file, -SessionOut:handle")
     def yicesIncludeFile(self, sessionIn, file, sessionOut):
-        print('yicesIncludeFile: entry')
-        sid = self.session_id(sessionIn)
-        print('sid: %s' % sid)
-        s_entry = self.session(sid)
-        print('s_entry: %s' % s_entry)
-        mgr = s_entry['manager']
-        print('mgr: %s' % mgr)
-        print('file: %s' % file)
-        print('filename: %s' % file['file'])
+        self.log.debug('yicesIncludeFile: entry')
+        mgr = self._mgr(sessionIn)
+        self.log.debug('mgr: %s', mgr)
+        self.log.debug('file: %s', file)
+        self.log.debug('filename: %s', file['file'])
         yid = mgr.yices_include(file['file'])
-        print('yid: %s' % yid)
+        self.log.debug('yid: %s', yid)
         if yid != 0:
             session_out = self.tick(sessionIn)
             return [{sessionOut: mk_term(session_out)}]
@@ -491,11 +589,9 @@ class YicesLibrary(InteractiveTool):
 
     def yices_push(self, sessionIn):
         ''' Utility for proessing yices commands.  It extracts the session
-        id sid from the sessionIn input, finds the session entry s_entry'''
-        sid = self.session_id(sessionIn) #check validity of sessionIn
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
-        result = mgr.yices_command('(push)')
+        id sid from the sessionIn input, finds the session manager mgr'''
+        mgr = self._mgr(sessionIn)
+        result = mgr.yices_push()
         if result == 0:
             self.fail(mgr.yices_get_last_error_msg())
         else:
@@ -505,15 +601,13 @@ class YicesLibrary(InteractiveTool):
     @Tool.predicate("+SessionIn:handle, -SessionOut:handle")
     def yicesPush(self, sessionIn, sessionOut):
         ''' Create a new level on the assertion stack.'''
-        print('yicesPush: entry')        
+        self.log.debug('yicesPush: entry')        
         result = self.yices_push(sessionIn)
         return [{sessionOut: mk_term(result)}]
 
     def yices_pop(self, sessionIn):
         ''' Utility for processing yices commands'''
-        sid = self.session_id(sessionIn) #check validity of sessionIn
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        mgr = self._mgr(sessionIn)
         result = mgr.yices_pop()
         if (result == 0):
             self.fail(mgr.yices_get_last_error_msg())
@@ -522,9 +616,9 @@ class YicesLibrary(InteractiveTool):
             return sessionOut
     
     @Tool.predicate("+SessionIn:handle, -SessionOut:handle")
-    def yicesPop(sessionIn, sessionOut):
+    def yicesPop(self, sessionIn, sessionOut):
         ''' Remove the top level from the assertion stack.'''
-        print('yicesPop: entry')        
+        self.log.debug('yicesPop: entry')        
         result = self.yices_pop(sessionIn)
         return [{sessionOut: mk_term(result)}]
 
@@ -535,10 +629,8 @@ class YicesLibrary(InteractiveTool):
     def yicesCheck(self, sessionIn, sessionOut, result): 
         ''' Check consistency of the context.  This method performs a
         satisfiability check.  It returns the result as a string.'''
-        print('yicesCheck: entry')        
-        sid = self.session_id(sessionIn)
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        self.log.debug('yicesCheck: entry')        
+        mgr = self._mgr(sessionIn)
         out = mgr.yices_check()
         newSession = self.tick(sessionIn)
         return [{sessionOut: mk_term(newSession), result: mk_term(out)}]
@@ -547,36 +639,30 @@ class YicesLibrary(InteractiveTool):
     def yicesInconsistent(self, sessionIn, result): 
         ''' Passively checks consistency of the context.  Only makes sense
         when preceded by a call to yicesCheck.  It returns the result as a string.'''
-        print('yicesInconsistent: entry')        
-        sid = self.session_id(sessionIn)
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        self.log.debug('yicesInconsistent: entry')        
+        mgr = self._mgr(sessionIn)
         out = mgr.yices_inconsistent()
         return [{result: mk_term(out)}]
 
     @Tool.predicate("+SessionIn:handle, Model:value")
     def yicesModel(self, sessionIn, model):
-        print('yicesModel: entry')        
-        sid = self.session_id(sessionIn)
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        self.log.debug('yicesModel: entry')        
+        mgr = self._mgr(sessionIn)
         assignment = mgr.yices_assignment()
-        print('assignment: %s' % assignment)
+        self.log.debug('assignment: %s', assignment)
         vars = [var for var in assignment]
         out = ''        
         for var in vars:
             out += '(= %s %s)' % (var, assignment[var])
         out = '(and %s)' % out
-        print('model %s' % out)
+        self.log.debug('model %s', out)
         return [{model: mk_term(out)}]
 
     @Tool.predicate("+SessionIn:handle, -SessionOut:handle")    
     def yicesReset(self, sessionIn, sessionOut):
         ''' Reset the logical context.'''
-        print('yicesReset: entry')        
-        sid = self.session_id(sessionIn)
-        s_entry = self.session(sid)
-        mgr = s_entry['manager']
+        self.log.debug('yicesReset: entry')        
+        mgr = self._mgr(sessionIn)
         result = mgr.yices_reset()
         if result == 0:
             self.fail(mgr.yices_get_last_error_msg())
@@ -1,8 +1,14 @@
 #Defines grammar for reading yices files; used in the include <file> api for yices.
+import os
 from pyparsing import *
 
+#Packrat parsing memoizes the alternatives of the grammar, but makes it
+#several times slower on typical yices files, so it has to be asked for.
+if os.environ.get('YICES_PACKRAT') == '1':
+    ParserElement.enablePackrat(128)
+
 #Grammar for s-expressions which is used to parse Yices expressions
-token = Word(alphanums + "-./_:*+=!<>")
+token = Regex(r"[A-Za-z0-9\-./_:*+=!<>]+")
 
 LPAR = "("
 RPAR = ")"
@@ -44,7 +50,7 @@ yReset = Literal("reset")
 yCommandName = yDefine + yAssert + yAssertPlus + yRetract + yCheck + yMaxSat + ySetEvidence + ySetVerbosity + ySetArithOnly + yPush + yPop + yEcho + yReset
 
 #name is word without colons
-name = Word(alphanums + "-./_*+=!<>")
+name = Regex(r"[A-Za-z0-9\-./_*+=!<>]+")
 colons = Suppress("::")
 
 #Define commands are treated differently since we have to parse out the '::'
@@ -65,28 +71,23 @@ yCommandList.ignore(lispStyleComment)
 
 # no longer used: defineName = Group(name + colons + sexp + sexpList)
 
-lparPrint = " ("
-rparPrint = ") "
-
 def printSexp(parsedSexp):
-    if parsedSexp == LPAR:
-        return lparPrint
-    elif parsedSexp == RPAR:
-        return rparPrint
-    elif type(parsedSexp) == str:
-        return parsedSexp
-    elif parsedSexp == []:
-        return ''
-    else:
-        print(parsedSexp)
-        first = printSexp(parsedSexp[0])
-        rest = printSexp(parsedSexp[1:])
-        print('first = %s' % first)
-        print('rest = %s' % rest)
-        if (first == lparPrint) or (first == rparPrint) or (rest == rparPrint):
-            return '%s%s' % (first, rest)
-        else: 
-            return '%s %s' % (first, rest)
+    '''Prints a parsed s-expression back as a string.  The expression is
+    walked with an explicit stack, so that printing is linear in its size
+    and does not recurse.'''
+    out = []
+    stack = [iter([parsedSexp])]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, basestring):
+            if out and node != RPAR and out[-1] != LPAR:
+                out.append(' ')
+            out.append(node)
+        else:
+            stack.append(iter(node))
+    return ''.join(out)
 
 test1 = """(define a::bool)"""
 test2 = """(define b ::bool)"""
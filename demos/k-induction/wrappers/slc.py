@@ -5,11 +5,67 @@
 # slc -m check <file.sl> -- checks that the file can be parsed correctly
 
 import os
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from etb.wrapper import Tool, BatchTool
 
 class SLC(BatchTool):
 
+    def __init__(self, etb):
+        BatchTool.__init__(self, etb)
+        # generated file -> ((model sha1, prop), fileref).  The name of
+        # a generated file does not depend on the property, so the entry
+        # is only valid for the last property it was generated for.
+        self._formulas = {}
+        # workers for yicesBmcFormulaSweep, created on first use
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _out_file(self, mode, modelFile, k):
+        return os.path.splitext(modelFile['file'])[0] + '_%s_%s.ys' % (mode, str(k))
+
+    def _cached(self, out, modelFile, prop):
+        """
+        Returns the fileref of out if it was generated for modelFile
+        and prop, None otherwise.
+        """
+        entry = self._formulas.get(out)
+        if entry is not None and entry[0] == (modelFile['sha1'], str(prop)):
+            return entry[1]
+        return None
+
+    def _slc(self, mode, modelFile, prop, k, out):
+        """
+        Run slc to generate out, returning its error output if it fails.
+        """
+        (ret, _, e) = self.callTool('../slc', '-m', mode, '-k', str(k),
+                                    '-p', str(prop), '-o', out, modelFile['file'])
+        if ret != 0:
+            return e
+        return None
+
+    def _put(self, out, modelFile, prop):
+        outref = self.fs.put_file(out)
+        self._formulas[out] = ((modelFile['sha1'], str(prop)), outref)
+        return outref
+
+    def _formula(self, mode, modelFile, prop, k):
+        """
+        Returns the fileref of the formula generated by slc in the given
+        mode and the error output of slc, one of which is None.  slc is
+        not run again for the same model, property and k.
+        """
+        out = self._out_file(mode, modelFile, k)
+        outref = self._cached(out, modelFile, prop)
+        if outref is None:
+            e = self._slc(mode, modelFile, prop, k, out)
+            if e is not None:
+                return (None, e)
+            outref = self._put(out, modelFile, prop)
+        return (outref, None)
+
     @Tool.predicate("+modelFile: file")
     def transitionSystem(self, modelFile):
         """
@@ -23,30 +79,52 @@ class SLC(BatchTool):
         Generate a BMC formula to depth k for the property in the model.
         The result is a yices file.
         """
-        out = os.path.splitext(modelFile['file'])[0] + '_bmc_%s.ys' % str(k)
-        (ret, _, e) = self.callTool('../slc', '-m', 'bmc', '-k', str(k),
-                                        '-p', str(prop), '-o', out, modelFile['file'])
-        if ret != 0:
+        (outref, e) = self._formula('bmc', modelFile, prop, k)
+        if e is not None:
             self.log.error(e)
             return { 'claims': ['error("yicesBmcFormula", "%s")' % e] }
-        
-        outref = self.fs.put_file(out)
+
         return [ self.bindResult(formula, outref)]
 
+    @Tool.predicate("+modelFile: file, +prop: value, +ks: value, -formulas: value")
+    def yicesBmcFormulaSweep(self, modelFile, prop, ks, formulas):
+        """
+        Generate the BMC formulas to each of the depths in ks for the
+        property in the model, running slc in parallel.  The result is
+        the list of yices files.
+        """
+        outs = [self._out_file('bmc', modelFile, k) for k in ks.get_args()]
+        todo = []
+        for (k, out) in zip(ks.get_args(), outs):
+            if (self._cached(out, modelFile, prop) is None
+                and out not in [o for (_, o) in todo]):
+                todo.append((k, out))
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(multiprocessing.cpu_count())
+        errors = self._pool.map(lambda (k, out): self._slc('bmc', modelFile, prop, k, out),
+                                todo)
+        for e in errors:
+            if e is not None:
+                self.log.error(e)
+                return { 'claims': ['error("yicesBmcFormulaSweep", "%s")' % e] }
+
+        # git is not used from the workers
+        for (_, out) in todo:
+            self._put(out, modelFile, prop)
+        return [ self.bindResult(formulas, [self._cached(out, modelFile, prop) for out in outs])]
+
     @Tool.predicate("modelFile: file, +prop: value, +k: value, -formula: file")
     def yicesInductionFormula(self, modelFile, prop, k, formula):
         """
         Generate an k-induction step formula for the property in the model.
         The result is a yices file.
         """
-        out = os.path.splitext(modelFile['file'])[0] + '_induction_%s.ys' % str(k)
-        (ret, _, e) = self.callTool('../slc', '-m', 'induction', '-k', str(k),
-                                        '-p', str(prop), '-o', out, modelFile['file'])
-        if ret != 0:
+        (outref, e) = self._formula('induction', modelFile, prop, k)
+        if e is not None:
             self.log.error(e)
             return { 'claims': ['error("yicesInductionFormula", "%s")' % e] }
-        
-        outref = self.fs.put_file(out)
+
         return [ self.bindResult(formula, outref)]
 
 def register(etb):
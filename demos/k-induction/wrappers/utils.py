@@ -4,13 +4,32 @@ from etb.wrapper import Tool
 
 import etb.terms
 
+# int -> its NumberConst term, shared by all in_range answers
+_NUMBERS = {}
+
+def _number(i):
+    t = _NUMBERS.get(i)
+    if t is None:
+        t = _NUMBERS[i] = etb.terms.mk_numberconst(i)
+    return t
+
+# val of a number term -> its int, to parse each number only once
+_INTS = {}
+
+def _as_int(t):
+    i = _INTS.get(t.val)
+    if i is None:
+        i = _INTS[t.val] = int(t.val)
+    return i
+
 class Utils(Tool):
     """Library of util functions, without tool invocation"""
 
     @Tool.sync
     @Tool.predicate("+left: value, +right: value")
     def equal(self, left, right):
-        if left == right:
+        # Terms are hashconsed, so equal terms are usually the same object
+        if left is right or (type(left) is type(right) and left == right):
             return [{}]
         else:
             return []
@@ -18,7 +37,7 @@ class Utils(Tool):
     @Tool.sync
     @Tool.predicate("+left: value, +right: value")
     def lte(self, left, right):
-        if int(left.val) <= int(right.val):
+        if _as_int(left) <= _as_int(right):
             return [{}]
         else:
             return []
@@ -27,7 +46,7 @@ class Utils(Tool):
     @Tool.predicate("+n: value, -pn: value")
     def pred(self, n, pn):
         '''Predecessor - we stop at 1 (that is what we need here)'''
-        n = int(n.val)
+        n = _as_int(n)
         if n > 1:
             return [self.bindResult(pn, n-1)]
         else:
@@ -36,21 +55,21 @@ class Utils(Tool):
     @Tool.sync
     @Tool.predicate("+n: value, -sn: value")
     def succ(self, n, sn):
-        n = int(n.val)
+        n = _as_int(n)
         return [self.bindResult(sn, n+1)]
         
     @Tool.sync
     @Tool.predicate("+low: value, +up: value, -result: value")
     def in_range(self, low, up, result):
         """Result in [low, up] range."""
-        low = int(low.val)
-        up = int(up.val)
+        low = _as_int(low)
+        up = _as_int(up)
         if low > up:
             return []
         if result.is_var():
-            return [{result : etb.terms.mk_const(i)} for i in range(low, up+1) ]
+            return ({result : _number(i)} for i in xrange(low, up+1))
         else:
-            result = int(result.val)
+            result = _as_int(result)
             if low <= result <= up:
                 return [{}]
             else:
@@ -1,32 +1,113 @@
-import re
-from etb.wrapper import Tool, BatchTool
+import subprocess, threading, atexit
+from etb.wrapper import Tool, BatchTool, tool_path, Substitutions, Success, Failure
+
+# Echoed after each problem sent to the persistent yices process, so
+# that we know where its answer ends.
+_DONE = '--etb-yices-done--'
+
+# First line of a yices answer
+_STATUSES = ('sat', 'unsat', 'unknown')
 
 class Yices(BatchTool):
     '''
-    ETB wrapper for Yices.
+    ETB wrapper for Yices.  The problems of a k-induction run are checked
+    in turn on a single long-lived yices process.  Each problem is
+    included between (push) and (pop): the problems define the same
+    state variables, and in yices 1 (reset) only drops the assertions,
+    not the definitions.  One-shot invocations are used if that process
+    fails.
     '''
-    
+
+    def __init__(self, etb):
+        BatchTool.__init__(self, etb)
+        self._proc = None
+        self._proc_lock = threading.Lock()
+        atexit.register(self._close_proc)
+
     def parseResult(self, (stdout, stderr)):
         '''
         Override the default result parser of the BatchTool class:
         returns 'sat', 'unsat' or 'unknown'
         '''
-        if re.search('^sat', stdout):
+        if stdout.startswith('sat'):
             return 'sat'
-        elif re.search('^unsat', stdout):
+        elif stdout.startswith('unsat'):
             return 'unsat'
         else:
             return 'unknown'
 
+    def _send(self, cmd):
+        self._proc.stdin.write(cmd + '\n')
+
+    def _read_until_prompt(self):
+        '''
+        Returns what yices printed for the commands sent so far.
+        '''
+        self._send('(echo "%s\\n")' % _DONE)
+        lines = []
+        for line in iter(self._proc.stdout.readline, ''):
+            if line.rstrip('\n') == _DONE:
+                return ''.join(lines)
+            lines.append(line)
+        raise IOError('yices exited: %s' % ''.join(lines))
+
+    def _close_proc(self):
+        if self._proc is not None:
+            try:
+                if self._proc.poll() is None:
+                    self._send('(exit)')
+                    self._proc.stdin.close()
+                    self._proc.wait()
+            except (IOError, OSError):
+                pass
+            self._proc = None
+
+    def _check_incremental(self, problem):
+        '''
+        Check the problem file on the persistent process.  Returns the
+        answer of yices, or None if it did not answer sat, unsat or
+        unknown.
+        '''
+        with self._proc_lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None:
+                    self._proc = subprocess.Popen([tool_path('yices')],
+                                                  close_fds=False,
+                                                  stdin=subprocess.PIPE,
+                                                  stdout=subprocess.PIPE,
+                                                  stderr=subprocess.STDOUT)
+                self._send('(push)')
+                self._send('(include "%s")' % problem)
+                self._send('(pop)')
+                output = self._read_until_prompt()
+            except (IOError, OSError) as msg:
+                self.log.error('yices: persistent process failed: {0}'.format(msg))
+                self._close_proc()
+                return None
+            if output.split('\n', 1)[0] not in _STATUSES:
+                self.log.error('yices: unexpected output {0}'.format(output))
+                self._close_proc()
+                return None
+            return output
+
     ### The predicates
-        
+
     @Tool.predicate("+problem: file, -result: value")
     def yices(self, problem, result):
         '''
         Call yices on a single problem stated fully in an input file.
         Returns 'sat', 'unsat' or 'unknown'.
         '''
-        return self.run(result, 'yices', problem['file'])
+        output = self._check_incremental(problem['file'])
+        if output is None:
+            return self.run(result, 'yices', problem['file'])
+        parsed = self.parseResult((output, ''))
+        if result.is_var():
+            return Substitutions(self, [ self.bindResult(result, parsed) ])
+        elif result.val == parsed:
+            return Success(self)
+        else:
+            return Failure(self)
 
 def register(etb):
     "Register the tool"
@@ -15,17 +15,22 @@ import os.path
 import platform
 from etb.wrapper import Tool, BatchTool, Substitutions, Errors
 
+# Suffix of the predicate names, e.g. 'Linux_x86_64'
+_PLATFORM = '%s_%s' % (platform.system(), platform.machine())
+
+# Environment of gcc, see above
+_GCC_ENV = dict(os.environ)
+_GCC_ENV['LC_ALL'] = 'C'
+_GCC_ENV['LANG'] = 'C'
+
 
 class Gcc(BatchTool):
 
     @Tool.predicate("+src: file, +dependencies: files, -obj: file",
-                    name='gcc_compile_%s_%s' % (platform.system(), platform.machine()))
+                    name='gcc_compile_' + _PLATFORM)
     def gcc_compile(self, src, deps, obj):
         dst = os.path.splitext(src['file'])[0] + '.o'
-        env = os.environ
-        env['LC_ALL'] = 'C'
-        env['LANG'] = 'C'
-        (ret, _, err) = self.callTool('gcc', '-c', '-o', dst, src['file'], env=env)
+        (ret, _, err) = self.callTool('gcc', '-c', '-o', dst, src['file'], env=_GCC_ENV)
         if ret != 0:
             self.log.error(err)
             return Errors(self,  [ err ] )
@@ -33,14 +38,11 @@ class Gcc(BatchTool):
         return Substitutions(self, [ self.bindResult(obj, objref) ])
 
     @Tool.predicate("+ofiles: files, +exename: value, -exe: file",
-                    name='gcc_link_%s_%s' % (platform.system(), platform.machine()))
+                    name='gcc_link_' + _PLATFORM)
     def gcc_link(self, ofiles, exename, exe):
         filenames = [ r['file'] for r in ofiles ]
         args = [ 'gcc', '-o', exename.val ] + filenames
-        env = os.environ
-        env['LC_ALL'] = 'C'
-        env['LANG'] = 'C'
-        (ret, _, err) = self.callTool(*args, env=env)
+        (ret, _, err) = self.callTool(*args, env=_GCC_ENV)
         if ret != 0:
             self.log.error(err)
             return Errors(self,  [ err ] ) 
@@ -1,6 +1,9 @@
 from etb.wrapper import Tool, Lemmata, Substitutions, Success, Failure
 
 import etb.terms
+import threading
+import multiprocessing
+from itertools import compress, izip
 
 class VeryComposite(Tool):
 
@@ -17,31 +20,174 @@ class VeryComposite(Tool):
     def verycomposite(self, n, m):
         n = abs(int(n.val))
         m = abs(int(m.val))
-        termlist = [ "composite(%s)" % i  for i in range(n, n + m)]
-        self.log.info("Lemmas: %s" % termlist)
+        _check_range(n, n + m)
+        termlist = map("composite(%d)".__mod__, xrange(n, n + m))
+        self.log.info("Lemmas: %s", termlist)
         return Lemmata(self, [{}], [ termlist ])
 
     @Tool.predicate('+n: value, +m: value')
     def verycompositeT(self, n, m):
         n = abs(int(n.val))
         m = abs(int(m.val))
-        lemmata = [ etb.terms.mk_apply("composite", [i])  for i in range(n, n + m)]
-        self.log.info("Lemmata: %s" % lemmata)
+        _check_range(n, n + m)
+        lemmata = [ etb.terms.mk_apply("composite", [i])  for i in xrange(n, n + m)]
+        self.log.info("Lemmata: %s", lemmata)
         return Lemmata(self, [{}], [ lemmata ])
 
 
+# Trial division by these primes rejects most composites cheaply
+_SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47,
+                 53, 59, 61, 67, 71, 73, 79, 83, 89, 97)
+
+# Miller-Rabin witnesses that are deterministic for all n < 2**64; above
+# that isPrime is a strong probable prime test.
+_WITNESSES = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)
+
+def _miller_rabin(n):
+    d = n - 1
+    s = 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+    for a in _WITNESSES:
+        a %= n
+        if a == 0:
+            continue
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+# n -> isPrime(n), emptied when it reaches _IS_PRIME_SIZE entries
+_IS_PRIME = {}
+_IS_PRIME_SIZE = 1 << 16
+
 def isPrime(n):
     n = abs(int(n))
-    if n < 2:
-        return False
-    if n == 2:
-        return True
-    if not n & 1:
-        return False
-    for x in range(3, int(n**0.5)+1, 2):
-        if n % x == 0:
+    result = _IS_PRIME.get(n)
+    if result is None:
+        result = _is_prime(n)
+        if len(_IS_PRIME) >= _IS_PRIME_SIZE:
+            _IS_PRIME.clear()
+        _IS_PRIME[n] = result
+    return result
+
+# Primes up to _base_limit, used to sieve ranges.  The list only grows:
+# larger bounds sieve the integers past _base_limit with the primes known.
+_base_primes = list(_SMALL_PRIMES)
+_base_limit = 100
+
+# Ranges are only sieved while their base primes stay below this bound;
+# above it the Miller-Rabin test in isPrime is cheaper.
+_SIEVE_LIMIT = 1 << 20
+
+def _primes_to(limit):
+    """Returns the primes up to at least limit."""
+    global _base_limit
+    while _base_limit < limit:
+        lo = _base_limit + 1
+        hi = min(max(limit, 2 * _base_limit), _base_limit * _base_limit)
+        flags = bytearray(b'\x01') * (hi + 1 - lo)
+        for p in _base_primes:
+            if p * p > hi:
+                break
+            start = max(p * p, (lo + p - 1) // p * p)
+            flags[start - lo::p] = bytearray((hi - start) // p + 1)
+        _base_primes.extend(compress(xrange(lo, hi + 1), flags))
+        _base_limit = hi
+    return _base_primes
+
+def _isqrt(n):
+    """Returns the largest integer whose square is at most n."""
+    if n <= 0:
+        return 0
+    x = 1 << ((n.bit_length() + 1) >> 1)
+    while True:
+        y = (x + n // x) >> 1
+        if y >= x:
+            return x
+        x = y
+
+def _segmented_sieve(lo, hi):
+    """
+    Returns a bytearray whose i-th entry is 1 if lo + i is prime and 0
+    otherwise, for lo <= lo + i < hi.
+    """
+    flags = bytearray(b'\x01') * (hi - lo)
+    for i in xrange(lo, min(hi, 2)):
+        flags[i - lo] = 0
+    for p in _primes_to(_isqrt(hi)):
+        if p * p >= hi:
+            break
+        start = max(p * p, (lo + p - 1) // p * p)
+        flags[start - lo::p] = bytearray((hi - 1 - start) // p + 1)
+    return flags
+
+def _check_range(lo, hi):
+    """
+    Records the primality of the integers in [lo, hi) in _IS_PRIME, with a
+    single sieve if they are small enough, and otherwise with isPrime tests
+    shared out between worker processes.
+    """
+    if lo >= hi or hi - lo > _IS_PRIME_SIZE:
+        return
+    if hi <= _SIEVE_LIMIT ** 2:
+        flags = _segmented_sieve(lo, hi)
+    elif hi - lo >= _PARALLEL_MIN:
+        flags = _test_range_parallel(lo, hi)
+    else:
+        return
+    if len(_IS_PRIME) + (hi - lo) > _IS_PRIME_SIZE:
+        _IS_PRIME.clear()
+    _IS_PRIME.update(izip(xrange(lo, hi), map(bool, flags)))
+
+# Ranges of integers too large to sieve are only tested in parallel from
+# this length on; shorter ones are left to isPrime.
+_PARALLEL_MIN = 1024
+
+# Worker processes for _test_range_parallel, created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+def _test_range(bounds):
+    (lo, hi) = bounds
+    return bytearray(_is_prime(i) for i in xrange(lo, hi))
+
+def _test_range_parallel(lo, hi):
+    """
+    Returns a bytearray whose i-th entry is 1 if lo + i is prime and 0
+    otherwise, with one chunk of [lo, hi) tested per cpu.
+    """
+    global _pool
+    ncpus = multiprocessing.cpu_count()
+    with _pool_lock:
+        if _pool is None:
+            _pool = multiprocessing.Pool(ncpus)
+    step = (hi - lo + ncpus - 1) // ncpus
+    chunks = _pool.map(_test_range,
+                       [(i, min(i + step, hi)) for i in xrange(lo, hi, step)])
+    return bytearray().join(chunks)
+
+# Primality of the integers below _TABLE_SIZE, filled in on first use
+_TABLE_SIZE = 1 << 16
+_table = None
+
+def _is_prime(n):
+    global _table
+    if n < _TABLE_SIZE:
+        if _table is None:
+            _table = _segmented_sieve(0, _TABLE_SIZE)
+        return _table[n] == 1
+    for p in _SMALL_PRIMES:
+        if n % p == 0:
             return False
-    return True
+    return _miller_rabin(n)
         
 def register(etb):
     etb.add_tool(VeryComposite(etb))
@@ -37,6 +37,7 @@ import graph
 # the dot generation
 import pydot
 import uuid
+import itertools
 
 # logging
 import logging
@@ -46,7 +47,39 @@ import bz2
 import os.path
 
 
+# The number of claims (or goals) load_logic_records adds at a time
+LOAD_BATCH_SIZE = 1000
+
+# The bz2 compression level of the logic state file
+SAVE_COMPRESSLEVEL = 3
+
+def logic_records(values):
+    """
+    Turn the JSON values of a logic state file into records: `('claim',
+    claim)` for each claim and `('goal', goal, annotation)` for each goal.
+    Values that already are such records are passed on; a value that is a
+    whole state `[claims, goals, annotations]` (the format of older files)
+    is split into records.
+    """
+    for value in values:
+        if value and isinstance(value[0], basestring):
+            yield value
+        else:
+            claims, goals, annotations = value
+            for claim in claims:
+                yield ('claim', claim)
+            for goal, annot in zip(goals, annotations):
+                yield ('goal', goal, annot)
+
+
 class Engine(object):
+
+    __slots__ = ['log', 'facts', 'rules', 'term_factory', 'inference_state',
+                 'logical_state',
+                 'explanation_cache', 'goal_key_cache', 'matching_claims_cache',
+                 'SLOW_MODE', 'CLOSE_DURING_INFERENCING',
+                 '__weakref__']
+
     def __init__(self, interpret_state):
         """
         Create an Engine object using a `interpret_state` (see
@@ -83,6 +116,23 @@ class Engine(object):
               `self.term_factory` and `self`. The `LogicalState` keeps track of
               rules, pending rules, claims, and dependencies. The
               `Inference` manipulates that state.
+            - `self.logical_state`: the
+              :class:`etb.datalog.model.LogicalState` of
+              `self.inference_state`
+            - `self.explanation_cache`: maps internal claims to the
+              explanation computed by
+              :func:`etb.datalog.engine.Engine.get_rule_and_facts_explanation`,
+              so that repeated calls to
+              :func:`etb.datalog.engine.Engine.get_claims` do not rebuild
+              them. It is emptied whenever claims or rules are added.
+            - `self.goal_key_cache`: maps external goals that have an
+              annotation to the frozen internal goal (or renaming) the
+              annotation is stored under, for
+              :func:`etb.datalog.engine.Engine.get_goal_annotation`.
+            - `self.matching_claims_cache`: maps frozen internal goals to the
+              list of claims of their annotation and the external claims
+              built from it by
+              :func:`etb.datalog.engine.Engine.get_claims_matching_goal`.
             - `self.SLOW_MODE`: is by default `False`; when `True` it causes
               the inferencing to pause between each step and to send extra info
               to the logger
@@ -128,8 +178,14 @@ class Engine(object):
                                                    interpret_state,
                                                    self.term_factory,
                                                    self)
+        # the inference keeps the same LogicalState for its lifetime
+        self.logical_state = self.inference_state.logical_state
         self.log.debug('Engine Created')
 
+        self.explanation_cache = {}
+        self.goal_key_cache = {}
+        self.matching_claims_cache = {}
+
         self.SLOW_MODE = False
         self.CLOSE_DURING_INFERENCING = False
 
@@ -167,9 +223,9 @@ class Engine(object):
                        .format(prule.clause, explanation))
  
         # Ask Inference State to add this internal claim
-        self.inference_state.lock()
-        self.inference_state.add_claim(prule, explanation, quiet=quiet)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.explanation_cache.clear()
+            self.inference_state.add_claim(prule, explanation, quiet=quiet)
 
     def add_claims(self, claims):
         """
@@ -187,16 +243,14 @@ class Engine(object):
 
 
         """
-        internal_claims = []
-
         self.log.debug("Engine is adding claims %s", claims)
 
-        for claim in claims:
-            internal_c = self.term_factory.mk_literal(claim.literal)
-            internal_claims.append((internal_c, claim.reason))
-        self.inference_state.lock()
-        self.inference_state.add_claims(internal_claims)
-        self.inference_state.unlock()
+        internal_lits = self.term_factory.mk_literals([claim.literal for claim in claims])
+        internal_claims = [(internal_c, claim.reason)
+                           for (internal_c, claim) in zip(internal_lits, claims)]
+        with self.inference_state:
+            self.explanation_cache.clear()
+            self.inference_state.add_claims(internal_claims)
 
     def add_errors(self, goal, errors):
         """
@@ -216,17 +270,16 @@ class Engine(object):
             `None`
         """
 
-        internal_errors = []
         internal_goal = self.term_factory.mk_literal(goal)
 
         self.log.info("Engine has added errors %s", errors)
 
-        for error in errors:
-            internal_c = self.term_factory.mk_literal(error.literal)
-            internal_errors.append(([internal_c], error.reason))
-        self.inference_state.lock()
-        self.inference_state.add_errors(internal_goal, internal_errors)
-        self.inference_state.unlock()
+        internal_lits = self.term_factory.mk_literals([error.literal for error in errors])
+        internal_errors = [([internal_c], error.reason)
+                           for (internal_c, error) in zip(internal_lits, errors)]
+        with self.inference_state:
+            self.explanation_cache.clear()
+            self.inference_state.add_errors(internal_goal, internal_errors)
 
     def add_goal_results(self, claims, goals, goal_results):
         """
@@ -236,31 +289,27 @@ class Engine(object):
                         each element is a list of indices into claims
         Creates a results data structure in the interpret state.
         """
-        gresults = dict(zip(goals, [[claims[i] for i in gr] for gr in goal_results]))
-        self.inference_state.interpret_state.add_goal_results(dict(gresults))
-        self.log.debug('add_goal_results: {0}'
-                       .format(self.inference_state.interpret_state.results))
+        # a fresh dict, which the interpret state can keep as it is
+        gresults = {goal: [claims[i] for i in gr] for goal, gr in zip(goals, goal_results)}
+        self.inference_state.interpret_state.add_goal_results(gresults)
+        self.log.debug('add_goal_results: %s', gresults)
 
     def load_goals(self, claims, goals, annotations):
         """
         Restores goal annotations, and updates dependency graph
         """
+        internal_claims = self.term_factory.mk_literals([claim.literal for claim in claims])
+        self._load_goals(internal_claims, goals, annotations)
+
+    def _load_goals(self, internal_claims, goals, annotations):
+        """
+        Like :func:`etb.datalog.engine.Engine.load_goals`, where the claims
+        of the annotations are looked up in `internal_claims`, the internal
+        literals of the claims.
+        """
         state = self.inference_state.logical_state
-        def mk_annotation(frozen_goal, annot):
-            """
-            annot has the form
-            {'kind': ann.kind, 'claims': aclaims, 'status': ann.status}
-            """
-            annotation = graph.Annotation(frozen_goal, annot['kind'], state)
-            annotation.claims = [[self.term_factory.mk_literal(claims[i].literal)] for i in annot['claims']]
-            # annotation.explanations = [[self.term_factory.mk_literal(claims[i].literal)] for i in annot['claims']]
-            annotation.status = annot['status']
-            self.inference_state.logical_state.goal_dependencies.add_annotation(frozen_goal, annotation)
-        for goal, annot in zip(goals, annotations):
-            internal_goal = self.term_factory.mk_literal(goal)
-            fgoal = model.freeze(internal_goal)
-            self.inference_state.logical_state.db_add_goal(internal_goal)
-            mk_annotation(fgoal, annot)
+        state.db_add_goals_with_annotations(self.term_factory.mk_literals(goals),
+                                            annotations, internal_claims)
 
     def add_goal(self, goal):
         """
@@ -294,9 +343,8 @@ class Engine(object):
         # Transform to Internal format
         internal_goal = self.term_factory.mk_literal(goal)
         # And add to inference engine:
-        self.inference_state.lock()
-        self.inference_state.add_goal(internal_goal)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.inference_state.add_goal(internal_goal)
 
     def push_no_solutions(self, goal):
         """
@@ -343,9 +391,8 @@ class Engine(object):
         assert isinstance(goal, terms.Literal), 'goal is not a Literal in push_no_solutions'
         assert self.inference_state.interpret_state.is_interpreted(goal), 'goal is not interpreted in push_no_solutions'
         internal_goal = self.term_factory.mk_literal(goal)
-        self.inference_state.lock()
-        self.inference_state.push_no_solutions(internal_goal)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.inference_state.push_no_solutions(internal_goal)
 
 
 
@@ -390,9 +437,9 @@ class Engine(object):
         if explanation is None:
             explanation = model.create_resolution_top_down_explanation(None, internal_goal)
         self.log.debug('engine.add_pending_rule: explanation: {0}, goal: {1}'.format(explanation, external_goal))
-        self.inference_state.lock()
-        prule = self.inference_state.add_pending_rule(internal_rule, explanation, internal_goal)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.explanation_cache.clear()
+            prule = self.inference_state.add_pending_rule(internal_rule, explanation, internal_goal)
         # only interpretstate will call pending rulef for goals (which means
         # that goal becomes automatically unstuck)
         #self.inference_state.lock()
@@ -401,6 +448,35 @@ class Engine(object):
         return prule
 
 
+    def add_pending_rules(self, rules, external_goal, internal_goal=None):
+        """
+        Add a list of pending `rules` obtained for the same `external_goal`.
+        This translates all the rules first and then adds them using
+        :func:`etb.datalog.inference.Inference.add_pending_rules`, which
+        takes the lock only once (instead of once per rule as a loop over
+        :func:`etb.datalog.engine.Engine.add_pending_rule` would).
+
+        :parameters:
+            - `rules`: a list of :class:`etb.terms.Clause`
+            - `external_goal`: is an instance of :class:`etb.terms.Term` and
+              represents the goal that caused the creation of these pending
+              rules.
+
+        :returntype:
+            a list with, for each rule, `None` or a `graph.PendingRule`
+        """
+        assert all(isinstance(rule, terms.Clause) for rule in rules), 'rule is not a terms.Clause in add_pending_rules'
+        assert isinstance(external_goal, terms.Literal)
+        internal_rules = [self.term_factory.mk_clause(rule) for rule in rules]
+        if internal_goal is None:
+            internal_goal = self.term_factory.mk_literal(external_goal)
+        explanation = model.create_resolution_top_down_explanation(None, internal_goal)
+        self.log.debug('Engine.add_pending_rules called with goal %s and rules %s',
+                       external_goal, rules)
+        with self.inference_state:
+            self.explanation_cache.clear()
+            return self.inference_state.add_pending_rules(internal_rules, explanation, internal_goal)
+
     def add_rule(self, rule, explanation):
         """
         Adds a KB rule to the Engine. In this case a *KB rule* means a rule of
@@ -437,9 +513,9 @@ class Engine(object):
         """
         assert isinstance(rule, terms.Clause) or isinstance(rule, terms.DerivationRule) or isinstance(rule, terms.InferenceRule), 'rule is not a terms.Clause, not a terms.DerivationRule, and not a terms.InferenceRule in add_rule'
         internal_rule = self.term_factory.mk_clause(rule)
-        self.inference_state.lock()
-        self.inference_state.add_rule(internal_rule, explanation)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.explanation_cache.clear()
+            self.inference_state.add_rule(internal_rule, explanation)
 
     def load_default_rules(self):
         """
@@ -479,41 +555,39 @@ class Engine(object):
             self.log.error("parse error while reading %s: %s",
                            rule_file, e)
             return
-        self.facts[rule_file] = []
-        self.rules[rule_file] = []
-        facts = [obj for obj in statements if isinstance(obj, terms.Literal)]
-        # parse some facts
-        axiom_num = 0
+        facts, rules, inf_rules = [], [], []
+        kinds = ((terms.Literal, facts),
+                 (terms.DerivationRule, rules),
+                 (terms.InferenceRule, inf_rules))
+        buckets = dict(kinds)
+        for obj in statements:
+            bucket = buckets.get(type(obj))
+            if bucket is None:
+                # subclasses, e.g., terms.InfixLiteral
+                bucket = next((b for (kind, b) in kinds if isinstance(obj, kind)), None)
+                if bucket is None:
+                    continue
+            bucket.append(obj)
         for fact in facts:
             assert fact.is_ground(), 'fact is not ground in load_rules'
-            assert isinstance(fact, terms.Literal), 'fact is not Literal'
-            axiom_num += 1
-            fact_rule = terms.mk_fact_rule(fact)
-            self.facts[rule_file].append(fact)
-            self.add_rule(fact_rule, model.create_axiom_explanation())
-            # self.add_claim(terms.Claim(fact, model.create_axiom_explanation()))
-        # parse some rules
-        rules_num = 0
-        rules = [obj for obj in statements if isinstance(obj, terms.DerivationRule)]
-        for rule in rules:
-            rules_num += 1
-            self.rules[rule_file].append(rule)
-            self.add_rule(rule, model.create_axiom_explanation())
-        # parse some inference rules
-        inf_rules_num = 0
-        rules = [obj for obj in statements if isinstance(obj, terms.InferenceRule)]
-        for rule in rules:
-            inf_rules_num += 1
-            self.rules[rule_file].append(rule)
-            self.add_rule(rule, model.create_axiom_explanation())
+        self.facts[rule_file] = facts
+        self.rules[rule_file] = rules + inf_rules
+        # Translate all the statements first, and add them under one lock
+        explanation = model.create_axiom_explanation()
+        mk_clause = self.term_factory.mk_clause
+        internal_rules = [(mk_clause(terms.mk_fact_rule(fact)), explanation) for fact in facts]
+        internal_rules.extend((mk_clause(rule), explanation) for rule in self.rules[rule_file])
+        with self.inference_state:
+            self.explanation_cache.clear()
+            self.inference_state.add_rules(internal_rules)
 
         self.log.debug('Parsed rules file %s:', os.path.abspath(rule_file))
-        if axiom_num > 0:
-            self.log.info('  %d axioms', axiom_num)
-        if rules_num > 0:
-            self.log.info('  %d derivation rules', rules_num)
-        if inf_rules_num > 0:
-            self.log.info('  %d inference rules', inf_rules_num)
+        if facts:
+            self.log.info('  %d axioms', len(facts))
+        if rules:
+            self.log.info('  %d derivation rules', len(rules))
+        if inf_rules:
+            self.log.info('  %d inference rules', len(inf_rules))
 
     def load_logic_file(self):
         """
@@ -523,30 +597,66 @@ class Engine(object):
         """
         filename = 'etb_logic_file'
         if os.path.exists(filename):
-            self.log.debug("Loading logic state file {0}".format(filename))
+            self.log.debug("Loading logic state file %s", filename)
             try:
                 with bz2.BZ2File(filename, 'r') as f:
-                    # file contents is a list [claims, goals, annotations]
-                    # for claim in claims:
-                    #     self.add_claim(claim, quiet=True)
-                    # for goal in content[1]:
-                    #     self.log.info('load_logic_file: add_goal_result {0!s}'
-                    #                   .format([str(gr) for gr in gres]))
-                    claims, goals, annotations = terms.load(f)
-                    # print 'claims = {0}'.format(claims)
-                    #print 'goals = {0}'.format(goals)
-                    #print 'annotations = {0}'.format(annotations)
-                    self.inference_state.lock()
-                    self.add_claims(claims)
-                    #self.add_goal_results(claims, goals, goal_results)
-                    self.load_goals(claims, goals, annotations)
-                    self.inference_state.unlock()
-                    self.log.info('loaded %d claims and %d goals from %s',
-                                  len(claims), len(goals), filename)
+                    with self.inference_state:
+                        (nclaims, ngoals) = self.load_logic_records(
+                            logic_records(terms.iter_load(f)))
+                self.log.info('loaded %d claims and %d goals from %s',
+                              nclaims, ngoals, filename)
             except Exception as err:
                 self.log.exception('unable to load logic state file {0}:\n {1}'
                                    .format(filename, err))
 
+    def load_logic_records(self, records):
+        """
+        Add the claims and goals of a logic state, given as an iterable of
+        records (see :func:`etb.datalog.engine.logic_records`). Claims and
+        goals are added in batches of `LOAD_BATCH_SIZE` as the records come
+        in. The claims of the annotations must come before their goals.
+
+        :returntype:
+            returns the pair (number of claims, number of goals) added
+        """
+        claims = []
+        goals = []
+        annotations = []
+        internal_claims = []
+        ngoals = 0
+        for record in records:
+            if record[0] == 'claim':
+                claims.append(record[1])
+                if len(claims) >= LOAD_BATCH_SIZE:
+                    self._load_claims(claims, internal_claims)
+                    claims = []
+            elif record[0] == 'goal':
+                goals.append(record[1])
+                annotations.append(record[2])
+                if len(goals) >= LOAD_BATCH_SIZE:
+                    self._load_claims(claims, internal_claims)
+                    claims = []
+                    self._load_goals(internal_claims, goals, annotations)
+                    ngoals += len(goals)
+                    goals = []
+                    annotations = []
+            else:
+                self.log.error('load_logic_records: unknown record {0}'.format(record))
+        self._load_claims(claims, internal_claims)
+        self._load_goals(internal_claims, goals, annotations)
+        return (len(internal_claims), ngoals + len(goals))
+
+    def _load_claims(self, claims, internal_claims):
+        """
+        Add `claims` and append their internal literals to `internal_claims`.
+        """
+        if claims:
+            internal_lits = self.term_factory.mk_literals([claim.literal for claim in claims])
+            with self.inference_state:
+                self.explanation_cache.clear()
+                self.inference_state.add_claims(zip(internal_lits, [claim.reason for claim in claims]))
+            internal_claims.extend(internal_lits)
+
     def check_stuck_goals(self, newpreds):
         """
         Force the engine to recheck its stuck goals (a stuck goal is a goal
@@ -570,9 +680,8 @@ class Engine(object):
             unstuck goals would not do anything useful.
 
         """
-        self.inference_state.lock()
-        self.inference_state.check_stuck_goals(newpreds)
-        self.inference_state.unlock()
+        with self.inference_state:
+            self.inference_state.check_stuck_goals(newpreds)
 
     def close(self):
         """
@@ -634,26 +743,31 @@ class Engine(object):
             returns a list of :class:`etb.terms.Claim` instances
 
         """
-        internal_claims = self.inference_state.get_claims()
-        if explanations:
-            def create_external_claim(internal_claim):
-                external_literal = self.term_factory.close_literal(internal_claim.clause[0])
+        return list(self.iter_claims(explanations))
+
+    def iter_claims(self, explanations=False):
+        """
+        Like :func:`etb.datalog.engine.Engine.get_claims`, but yields the
+        claims one at a time instead of building the list.
+
+        :returntype:
+            returns an iterator over :class:`etb.terms.Claim` instances
+
+        """
+        close_literal = self.term_factory.close_literal
+        explanation_cache = self.explanation_cache
+        for internal_claim in self.inference_state.get_claims():
+            external_literal = close_literal(internal_claim.clause[0])
+            if explanations:
                 intexpl = self.inference_state.logical_state.db_get_explanation(internal_claim)
                 expl = self.term_factory.close_explanation(intexpl)
-                external_claim = terms.Claim(external_literal, expl)
-                return external_claim
-            external_claims = map(lambda claim: create_external_claim(claim), internal_claims)
-        else:
-            internal_lits = {iclaim.clause[0] for iclaim in internal_claims}
-            def create_external_claim(internal_claim):
-                external_literal = self.term_factory.close_literal(internal_claim.clause[0])
-                #intexpl = self.inference_state.logical_state.db_get_explanation(internal_claim)
-                expl = self.get_rule_and_facts_explanation(internal_claim)
-                external_claim = terms.Claim(external_literal, expl)
-                self.log.info('engine.get_claims: expl = {0}'.format(expl))
-                return external_claim
-            external_claims = [create_external_claim(claim) for claim in internal_claims]
-        return external_claims
+            else:
+                expl = explanation_cache.get(internal_claim)
+                if expl is None:
+                    expl = self.get_rule_and_facts_explanation(internal_claim)
+                    explanation_cache[internal_claim] = expl
+                self.log.info('engine.get_claims: expl = %s', expl)
+            yield terms.Claim(external_literal, expl)
 
     def get_goal_results(self):
         """
@@ -663,15 +777,22 @@ class Engine(object):
         return self.inference_state.interpret_state.get_goal_results()
 
     def get_goal_annotation(self, goal):
+        get_annotation = self.inference_state.logical_state.goal_dependencies.get_annotation
+        fgoal = self.goal_key_cache.get(goal)
+        if fgoal is not None:
+            return get_annotation(fgoal)
         internal_goal = self.term_factory.mk_literal(goal)
         rename_goal = self.inference_state.logical_state.is_renaming_present_of_goal(internal_goal)
         if rename_goal:
             fgoal = model.freeze(rename_goal)
         else:
             fgoal = model.freeze(internal_goal)
-        annot = self.inference_state.logical_state.goal_dependencies.get_annotation(fgoal)
+        annot = get_annotation(fgoal)
         if not annot:
             print('No annotation for {0} goal {1}'.format("rename" if rename_goal else "", fgoal))
+        else:
+            # the goal is in the dependency graph, so its key stays the same
+            self.goal_key_cache[goal] = fgoal
         return annot
 
     def get_goal_annotations(self, goal_results):
@@ -693,12 +814,21 @@ class Engine(object):
             returns a list of :class:`etb.terms.Clause` instances
 
         """
-        internal_rules = self.inference_state.get_rules()
-        external_rules = []
-        def transform_internal_rule_to_external_rule(internal):
-            closed_literals = self.term_factory.close_literals(internal)
-            return terms.Clause(closed_literals[0], closed_literals[1:])
-        return map(lambda rule: transform_internal_rule_to_external_rule(rule), internal_rules)
+        return list(self.iter_rules())
+
+    def iter_rules(self):
+        """
+        Like :func:`etb.datalog.engine.Engine.get_rules`, but yields the
+        rules one at a time instead of building the list.
+
+        :returntype:
+            returns an iterator over :class:`etb.terms.Clause` instances
+
+        """
+        close_literals = self.term_factory.close_literals
+        for internal_rule in self.inference_state.get_rules():
+            closed_literals = close_literals(internal_rule)
+            yield terms.Clause(closed_literals[0], closed_literals[1:])
 
 
     def get_stuck_goals(self):
@@ -804,24 +934,36 @@ class Engine(object):
         internal_goal = self.term_factory.mk_literal(goal)
         internal_claims, explanations = self.inference_state.get_claims_matching_goal(internal_goal)
         assert(len(internal_claims) == len(explanations))
-        self.log.info('engine.get_claims_matching_goal: internal_claims {0}'
-                      .format(internal_claims))
-        def create_external_claim(internal_claim, explanation):
-            external_literal = self.term_factory.close_literal(internal_claim[0])
-            external_claim = terms.Claim(external_literal, self.get_rule_and_facts_explanation(internal_claim, explanation))
-            return external_claim
-
-        return map(lambda (claim, expl): create_external_claim(claim, expl),
-                   zip(internal_claims, explanations))
+        self.log.info('engine.get_claims_matching_goal: internal_claims %s',
+                      internal_claims)
+        # The claims of a goal annotation are only ever appended to, so the
+        # external claims built for the same list can be reused and only the
+        # new ones need to be built.
+        key = model.freeze(internal_goal)
+        cached = self.matching_claims_cache.get(key)
+        if cached is not None and cached[0] is internal_claims:
+            claims = cached[1]
+        else:
+            claims = []
+            self.matching_claims_cache[key] = (internal_claims, claims)
+        if len(claims) < len(internal_claims):
+            close_literal = self.term_factory.close_literal
+            get_explanation = self.get_rule_and_facts_explanation
+            claims.extend(terms.Claim(close_literal(internal_claim[0]),
+                                      get_explanation(internal_claim, explanation))
+                          for internal_claim, explanation
+                          in zip(internal_claims[len(claims):], explanations[len(claims):]))
+        return list(claims)
 
     def get_substitutions(self, goal):
         """
         Return a list of substitutions :class:`etb.terms.Subst` where each
         substitution is obtained by unifying the goal with each matching claim.
-        The matching claims are obtained by
-        :func:`etb.datalog.engine.Engine.get_claims_matching_goal` and unification is
+        The matching claims are the ones of
+        :func:`etb.datalog.engine.Engine.get_claims_matching_goal` (only
+        their literals are needed) and unification is
         done using :func:`etb.terms.Term.unify` (see also the latter for the form of
-        a substitution).
+        a substitution). A ground goal has at most one, empty, substitution.
 
         :parameters:
             - `goal`: an instance of :class:`etb.terms.Term`
@@ -834,16 +976,36 @@ class Engine(object):
             :func:`etb.datalog.test.engine_test.TestEngine.test_get_substitutions`
 
         """
-        matching_claims = self.get_claims_matching_goal(goal)
-        self.log.debug('matching claims {0} for goal {1}'
-                       .format(matching_claims, goal))
+        assert isinstance(goal, terms.Literal), 'goal is not a Literal in get_substitutions'
+        internal_goal = self.term_factory.mk_literal(goal)
+        matching_literals = self._get_matching_literals(internal_goal)
+        self.log.debug('matching literals %s for goal %s',
+                       matching_literals, goal)
+        if goal.is_ground():
+            # every matching claim is the goal itself
+            return [terms.Subst()] if matching_literals else []
         substitutions = []
-        for claim in matching_claims:
-            subst = goal.unify(claim.literal)
+        for literal in matching_literals:
+            subst = goal.unify(literal)
             if subst is not None:
                 substitutions.append(subst)
         return substitutions
 
+    def _get_matching_literals(self, internal_goal):
+        """
+        The literals of the claims matching `internal_goal`, as
+        :func:`etb.datalog.engine.Engine.get_claims_matching_goal` finds
+        them, but without building the claims and their explanations.
+
+        :returntype:
+            returns a list of :class:`etb.terms.Literal` instances
+        """
+        matching = self.inference_state.get_claims_matching_goal(internal_goal)
+        if not matching:
+            return []
+        close_literal = self.term_factory.close_literal
+        return [close_literal(internal_claim[0]) for internal_claim in matching[0]]
+
     def all_claims(self, goal):
         """
         Synonym for :func:`etb.datalog.engine.Engine.get_claims_matching_goal`.
@@ -874,83 +1036,97 @@ class Engine(object):
             `None`
 
         """
+        self.explanation_cache.clear()
+        self.goal_key_cache.clear()
+        self.matching_claims_cache.clear()
         self.inference_state.clear()
 
     def reset(self, keepRules=True):
+        self.explanation_cache.clear()
+        self.goal_key_cache.clear()
+        self.matching_claims_cache.clear()
         self.inference_state.reset()
 
-    def __readable_clause(self,list_of_terms):
-        """
-        Convenience function to produce a string out of a list of strings
-        that is assumed to represent a rule.
-        """
-        if len(list_of_terms) == 1:
-            return str(list_of_terms[0]) + "."
-        else:
-            return str(list_of_terms[0]) +  " :- " + ",".join(map(lambda literal: str(literal), list_of_terms[1:]))
-
-
     def get_rule_and_facts_explanation(self, claim, explanation=None):
         assert (isinstance(claim, (graph.PendingRule, terms.Claim)) or
                 model.is_internal_clause(claim)), 'claim {0}: {1}'.format(claim, type(claim))
-        self.log.debug('get_rule_and_facts_explanation: claim {0}, explanation {1}'
-                       .format(claim, explanation))
+        # the walk is on the path of get_claims: skip all logging unless
+        # debugging
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.log.debug('get_rule_and_facts_explanation: claim {0}, explanation {1}'
+                           .format(claim, explanation))
         #internal_fact = self.term_factory.mk_literal(claim.clause[0])
 
         # the facts and 1 rule to collect
         facts = []
-        rule = [None]
-
-        def generate_children(cl, explanation=None):
+        rule = None
+
+        # Walk the explanation depth first with an explicit stack; a clause
+        # shared by several sub-proofs is only visited once.
+        db_get_explanation = self.inference_state.logical_state.db_get_explanation
+        close_literal = self.term_factory.close_literal
+        close_literals = self.term_factory.close_literals
+        stack = [(claim, explanation)]
+        seen = set()
+        while stack:
+            cl, explanation = stack.pop()
             assert (isinstance(cl, (graph.PendingRule, terms.Claim)) or
                     model.is_internal_clause(cl)), 'cl = {0}: {1}'.format(cl, type(cl))
+            key = model.freeze(cl) if isinstance(cl, list) else cl
+            if key in seen:
+                continue
+            seen.add(key)
             if explanation is None:
-                explanation = self.inference_state.logical_state.db_get_explanation(cl)
+                explanation = db_get_explanation(cl)
                 assert explanation[0] != "None", 'Could not get explanation for {0}'.format(cl)
             else:
                 assert explanation[0] != "None"
-            external_explanation = self.term_factory.close_explanation(explanation)
             if isinstance(explanation, tuple) and len(explanation) == 1: # an Axiom or External or None
-                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is External or Axiom or None" % (claim, external_explanation))
+                if debug:
+                    self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is External or Axiom or None", claim, explanation)
                 lit = cl[0] if isinstance(cl, (list, tuple)) else (
                     cl.clause[0] if isinstance(cl, graph.PendingRule) else cl.literal)
                 if isinstance(lit, terms.Literal):
                     lit = self.term_factory.mk_literal(lit)
                 assert model.is_internal_literal(lit), 'lit {0} is not internal literal'.format(lit)
-                facts.append(self.term_factory.close_literal(lit))
+                facts.append(close_literal(lit))
 
             elif isinstance(explanation, tuple) and len(explanation) == 3 and explanation[0] == "ResolutionTopDown":
-                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is ResolutionTopDown" % (claim, external_explanation))
+                if debug:
+                    self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is ResolutionTopDown", claim, explanation)
                 lits = cl.clause if isinstance(cl, graph.PendingRule) else cl
                 if len(lits) == 1:
-                    facts.append(self.term_factory.close_literal(lits[0]))
+                    facts.append(close_literal(lits[0]))
                 else:
-                    rule[0] = self.__readable_clause(self.term_factory.close_literals(lits))
+                    rule = model.readable_terms(close_literals(lits))
 
             elif isinstance(explanation, tuple) and len(explanation) == 4 and explanation[0] == "ResolutionBottomUp":
                 # ("ResolutionBottomUp", pending_rule, clause, clause_expl)
-                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is ResolutionBottomUp" % (claim, external_explanation))
-                rule_expl = self.inference_state.logical_state.db_get_explanation(explanation[1])
-                assert rule_expl[0] != "None"
+                if debug:
+                    self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is ResolutionBottomUp", claim, explanation)
                 assert explanation[3] != "None"
-                generate_children(explanation[1])
-                generate_children(explanation[2], explanation[3])
+                # pushed in reverse, so the pending rule is visited first
+                stack.append((explanation[2], explanation[3]))
+                stack.append((explanation[1], None))
 
             elif isinstance(explanation, (terms.Literal, unicode)):
-                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is TERM" % (claim, external_explanation))
+                external_explanation = self.term_factory.close_explanation(explanation)
+                if debug:
+                    self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is TERM", claim, external_explanation)
                 facts.append(external_explanation)
-            else:
-                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is UNKNOWN" % (claim, external_explanation))
-
-        generate_children(claim, explanation)
-        self.log.debug('engine.get_rule_and_facts_explanation: rule[0] = {0}, facts = {1}'
-                      .format(rule[0], facts))
-        if rule[0] is not None:
-            return "from rule " + rule[0] + " with facts: " + ", ".join(map(lambda literal: str(literal), facts))
+            elif debug:
+                self.log.debug("get_rule_and_facts_explanation: claim %s has explanation %s and is UNKNOWN", claim, explanation)
+
+        if debug:
+            self.log.debug('engine.get_rule_and_facts_explanation: rule = {0}, facts = {1}'
+                           .format(rule, facts))
+        if rule is not None:
+            return "from rule " + rule + " with facts: " + ", ".join([str(literal) for literal in facts])
         elif len(facts) == 1:
             return str(facts[0])
         else:
-            return ", ".join(map(lambda literal: str(literal), facts))
+            return ", ".join([str(literal) for literal in facts])
 
     def to_png(self, claim, explanation=None):
         """
@@ -968,84 +1144,107 @@ class Engine(object):
         created PNG file.
 
         """
-        #internal_fact = self.term_factory.mk_literal(claim.literal)
+        internal_fact = self.term_factory.mk_literal(claim.literal)
+        logical_state = self.inference_state.logical_state
+        # claims are stored in `db_all` under their PendingRule
+        internal_claim = logical_state.db_get_claim_with_literal(model.freeze(internal_fact))
+        if internal_claim is None:
+            internal_claim = [internal_fact]
 
-        graph = pydot.Dot(graph_type='graph')
+        pygraph = pydot.Dot(graph_type='graph')
 
-        def generate_children(cl):
+        # Walk the explanation depth first with an explicit stack; a clause
+        # shared by several sub-proofs only gets its node (and children) once.
+        db_get_explanation = logical_state.db_get_explanation
+        close_literal = self.term_factory.close_literal
+        close_literals = self.term_factory.close_literals
+        stack = [(internal_claim, explanation)]
+        seen = set()
+        # goals resolved by several clauses get one node
+        goal_names = set()
+        # the names of the unlabeled nodes only need to be unique in this graph
+        node_ids = itertools.count()
+        while stack:
+            cl, explanation = stack.pop()
+            key = model.freeze(cl) if isinstance(cl, list) else cl
+            if key in seen:
+                continue
+            seen.add(key)
             #print("generate_children(%s)" % repr(cl))
             if explanation is None:
-                explanation = self.inference_state.logical_state.db_get_explanation(cl)
+                explanation = db_get_explanation(cl)
                 assert explanation[0] != "None", 'Could not get explanation for {0}'.format(cl)
             else:
                 assert explanation[0] != "None"
             #print("explanation = %s" % repr(explanation))
-            external_explanation = self.term_factory.close_explanation(explanation)
-            #print("external_explanation = %s" % external_explanation)
-            label_top_node = self.__readable_clause(self.term_factory.close_literals(cl))
+            lits = cl.clause if isinstance(cl, graph.PendingRule) else cl
+            label_top_node = model.readable_terms(close_literals(lits))
             top_node = pydot.Node(str(cl),label=label_top_node)
-            graph.add_node(top_node)
+            pygraph.add_node(top_node)
             #the isinstance stuff is a hack to prevent crashing
             if  isinstance(explanation, tuple) and len(explanation) == 1: # an Axiom or External
-                axiom_node = pydot.Node(str(uuid.uuid4()), label=external_explanation)
-                graph.add_node(axiom_node)
+                external_explanation = self.term_factory.close_explanation(explanation)
+                axiom_node = pydot.Node('_n%d' % next(node_ids), label=external_explanation)
+                pygraph.add_node(axiom_node)
                 edge = pydot.Edge(top_node, axiom_node)
-                graph.add_edge(edge)
+                pygraph.add_edge(edge)
             elif isinstance(explanation, tuple) and len(explanation) == 3 and explanation[0] == "ResolutionTopDown":
                 # Note that we do not recurse through the goal node
-                goal_explanation = pydot.Node(str(explanation[2]), label=str(self.term_factory.close_literal(explanation[2])))
-                goal_node_id = str(uuid.uuid4())
-                goal_node = pydot.Node(goal_node_id, label="Goal")
-                graph.add_node(goal_node)
-                graph.add_node(goal_explanation)
-                resolution_node = pydot.Node(str(uuid.uuid4()), label=explanation[0])
-                graph.add_node(resolution_node)
+                goal_name = str(explanation[2])
+                if goal_name not in goal_names:
+                    goal_names.add(goal_name)
+                    goal_explanation = pydot.Node(goal_name, label=str(close_literal(explanation[2])))
+                    goal_node_id = '_n%d' % next(node_ids)
+                    goal_node = pydot.Node(goal_node_id, label="Goal")
+                    pygraph.add_node(goal_node)
+                    pygraph.add_node(goal_explanation)
+                    pygraph.add_edge(pydot.Edge(goal_name, goal_node_id))
+                resolution_node = pydot.Node('_n%d' % next(node_ids), label=explanation[0])
+                pygraph.add_node(resolution_node)
                 edge1 = pydot.Edge(top_node, resolution_node )
                 edge2 = pydot.Edge(top_node, str(explanation[1]))
-                edge3 = pydot.Edge(top_node, str(explanation[2]))
-                edge4 = pydot.Edge(str(explanation[2]), goal_node_id)
-                graph.add_edge(edge1)
-                graph.add_edge(edge2)
-                graph.add_edge(edge3)
-                graph.add_edge(edge4)
+                edge3 = pydot.Edge(top_node, goal_name)
+                pygraph.add_edge(edge1)
+                pygraph.add_edge(edge2)
+                pygraph.add_edge(edge3)
                 if explanation[1] is not None:
-                    generate_children(explanation[1])
+                    stack.append((explanation[1], None))
 
             elif isinstance(explanation, tuple) and len(explanation) == 4 and explanation[0] == "ResolutionBottomUp": # ResolutionBottomUp
-                node = pydot.Node(str(uuid.uuid4()), label=explanation[0])
-                graph.add_node(node)
+                node = pydot.Node('_n%d' % next(node_ids), label=explanation[0])
+                pygraph.add_node(node)
                 edge1 = pydot.Edge(top_node, node)
                 edge2 = pydot.Edge(top_node, str(explanation[1]))
                 edge3 = pydot.Edge(top_node, str(explanation[2]))
-                graph.add_edge(edge1)
-                graph.add_edge(edge2)
-                graph.add_edge(edge3)
-                generate_children(explanation[1])
-                generate_children(explanation[2], explanation[3])
+                pygraph.add_edge(edge1)
+                pygraph.add_edge(edge2)
+                pygraph.add_edge(edge3)
+                # pushed in reverse, so the pending rule is visited first
+                stack.append((explanation[2], explanation[3]))
+                stack.append((explanation[1], None))
 
             elif isinstance(explanation, terms.Term):
-                node = pydot.Node(str(uuid.uuid4()), label="External")
-                graph.add_node(node)
+                node = pydot.Node('_n%d' % next(node_ids), label="External")
+                pygraph.add_node(node)
                 edge1 = pydot.Edge(top_node, node )
-                graph.add_edge(edge1)
+                pygraph.add_edge(edge1)
                 # only add explanation if it's actually different from the
                 # top_node's label
                 # -1 cause there is a dot to end a clause
                 if not str(explanation) == label_top_node[:-1]:
                     edge2 = pydot.Edge(top_node, str(explanation))
-                    graph.add_edge(edge2)
+                    pygraph.add_edge(edge2)
             else:
                # just make a string out of the explanation and show it
-                node = pydot.Node(str(uuid.uuid4()), label="Unknown")
-                graph.add_node(node)
+                node = pydot.Node('_n%d' % next(node_ids), label="Unknown")
+                pygraph.add_node(node)
                 edge1 = pydot.Edge(top_node, node )
                 edge2 = pydot.Edge(top_node, str(explanation))
-                graph.add_edge(edge1)
-                graph.add_edge(edge2)
+                pygraph.add_edge(edge1)
+                pygraph.add_edge(edge2)
 
-        generate_children([internal_fact], explanation)
         filename = str(uuid.uuid4()) + ".png"
-        graph.write_png(filename)
+        pygraph.write_png(filename)
         return [filename]
 
     def get_global_time(self):
@@ -1060,7 +1259,7 @@ class Engine(object):
             returns a positive integer
 
         """
-        return self.inference_state.logical_state.get_global_time()
+        return self.logical_state.global_time
 
     def inc_global_time(self):
         """
@@ -1073,7 +1272,7 @@ class Engine(object):
             :func:`etb.datalog.engine.Engine.get_global_time`
 
         """
-        self.inference_state.logical_state.global_time += 1
+        self.logical_state.global_time += 1
 
     def go_slow(self, speed):
         """
@@ -1151,131 +1350,144 @@ class Engine(object):
 
         # first push goals to be reevaluated (stuck or not stuck?)
         # self.check_stuck_goals()
-        self.inference_state.lock()
-
-        internal_goal = self.term_factory.mk_literal(goal)
-        internal_deps = self.inference_state.logical_state.db_get_goal_dependencies()
-
-        pygraph = pydot.Dot(graph_type='graph')
-
-        def generate_children(root, previous_index):
-
-            annotation_root = self.inference_state.logical_state.db_get_annotation(root)
-            if not annotation_root:
-                return
-            index_root = annotation_root.index
-
-            if index_root < previous_index:
-                return
-
-            subgoalindex_root = annotation_root.subgoalindex
-            claims_root = map(lambda claim: claim[0], annotation_root.claims)
-            status_root = annotation_root.print_status()
-            goal_root = annotation_root.goal
-            if goal_root:
-                pretty_print_goal = str("\n\t\t(goal: " + str(self.term_factory.close_literal(goal_root)) + " )")
-            else:
-                pretty_print_goal = ""
-            pretty_print_subgoalindex = str("\n\t\t(prop: " + str(subgoalindex_root) + ")")
-            pretty_print_claims = str("\n\t\t(claims: " + str(self.term_factory.close_literals(claims_root)) + " )")
-            pretty_print_index = str("\n\t\t(index: " + str(index_root) + " )")
-            pretty_print_status = str("\n\t\t(status: " + status_root + " )")
-            #pretty_print_gT = "\n\t\t(g.T: " + str(annotation_root.print_gT(self.term_factory))
-            #pretty_print_gD = "\n\t\t(g.D: " + str(annotation_root.print_gD(self.term_factory)) + " )"
-
-            clroot = root.clause if isinstance(root, graph.PendingRule) else root
-            if any(isinstance(el, tuple) for el in clroot):
-                self.log.debug("png generation: %s", self.__readable_clause(self.term_factory.close_literals(clroot)))
-                root_node = pydot.Node(str(clroot),
-                        label=self.__readable_clause(self.term_factory.close_literals(clroot))
-                        + pretty_print_subgoalindex +
-                        pretty_print_goal +
-                        pretty_print_index)
-            else:
-                self.log.debug("png generation: %s", str(self.term_factory.close_literal(clroot)))
-                root_node = pydot.Node(str(clroot),
-                        label=str(self.term_factory.close_literal(clroot)) +
-                        pretty_print_claims +
-                        pretty_print_index +
-                        #pretty_print_gT + pretty_print_gD +
-                        pretty_print_status)
-
-            if self.inference_state.is_stuck_goal(list(clroot)):
-                 root_node.set("shape", 'box')
-
-            pygraph.add_node(root_node)
-
-            children = internal_deps.get_children(root)
-
-            if children:
-                for child in children:
-                    pygraph.add_edge(pydot.Edge(root_node, str(child)))
-                    generate_children(child, index_root)
-            else:
-                return
-
-        generate_children(tuple(internal_goal), 0)
-        filename = str(uuid.uuid4()) + ".png"
-        pygraph.write_png(filename)
-        self.inference_state.unlock()
+        with self.inference_state:
+            internal_goal = self.term_factory.mk_literal(goal)
+            internal_deps = self.inference_state.logical_state.db_get_goal_dependencies()
+
+            pygraph = pydot.Dot(graph_type='graph')
+
+            # Walk the dependencies depth first with an explicit stack; a node
+            # reachable along several paths is only rendered once (edges to it
+            # are added by each parent).
+            db_get_annotation = self.inference_state.logical_state.db_get_annotation
+            is_stuck_goal = self.inference_state.is_stuck_goal
+            close_literal = self.term_factory.close_literal
+            close_literals = self.term_factory.close_literals
+            stack = [(tuple(internal_goal), 0)]
+            visited = set()
+            while stack:
+                root, previous_index = stack.pop()
+                if root in visited:
+                    continue
+
+                annotation_root = db_get_annotation(root)
+                if not annotation_root:
+                    continue
+                index_root = annotation_root.index
+
+                if index_root < previous_index:
+                    continue
+                visited.add(root)
+
+                subgoalindex_root = annotation_root.subgoalindex
+                claims_root = [claim[0] for claim in annotation_root.claims]
+                status_root = annotation_root.print_status()
+                goal_root = annotation_root.goal
+                if goal_root:
+                    pretty_print_goal = str("\n\t\t(goal: " + str(close_literal(goal_root)) + " )")
+                else:
+                    pretty_print_goal = ""
+                pretty_print_subgoalindex = str("\n\t\t(prop: " + str(subgoalindex_root) + ")")
+                pretty_print_claims = str("\n\t\t(claims: " + str(close_literals(claims_root)) + " )")
+                pretty_print_index = str("\n\t\t(index: " + str(index_root) + " )")
+                pretty_print_status = str("\n\t\t(status: " + status_root + " )")
+                #pretty_print_gT = "\n\t\t(g.T: " + str(annotation_root.print_gT(self.term_factory))
+                #pretty_print_gD = "\n\t\t(g.D: " + str(annotation_root.print_gD(self.term_factory)) + " )"
+
+                clroot = root.clause if isinstance(root, graph.PendingRule) else root
+                if any(isinstance(el, tuple) for el in clroot):
+                    label_root = model.readable_terms(close_literals(clroot))
+                    self.log.debug("png generation: %s", label_root)
+                    root_node = pydot.Node(str(clroot),
+                            label=label_root
+                            + pretty_print_subgoalindex +
+                            pretty_print_goal +
+                            pretty_print_index)
+                else:
+                    label_root = str(close_literal(clroot))
+                    self.log.debug("png generation: %s", label_root)
+                    root_node = pydot.Node(str(clroot),
+                            label=label_root +
+                            pretty_print_claims +
+                            pretty_print_index +
+                            #pretty_print_gT + pretty_print_gD +
+                            pretty_print_status)
+                    # only goals can be stuck (the stuck goals index
+                    # stores them as lists)
+                    if is_stuck_goal(list(clroot)):
+                        root_node.set("shape", 'box')
+
+                pygraph.add_node(root_node)
+
+                children = internal_deps.get_children(root)
+
+                if children:
+                    child_names = set()
+                    for child in children:
+                        child_name = str(child)
+                        if child_name not in child_names:
+                            child_names.add(child_name)
+                            pygraph.add_edge(pydot.Edge(root_node, child_name))
+                    # pushed in reverse, so the first child is visited first
+                    stack.extend((child, index_root) for child in reversed(children))
+
+            filename = str(uuid.uuid4()) + ".png"
+            pygraph.write_png(filename)
         return filename
 
     def save_logic_file(self, *args, **kwargs):
         """
-        Save the current logic state in the file.
-        This is a list with four elements:
-        claims the list of (external) claims
-        goals the list of (external) goals (Literals)
-        goal_results a list of lists of integers.  This corresponds to
-          the goals list, and each element is a list of indices into the claims list
-        annotations is a list of annotations, where the claims and 
+        Save the current logic state in the file, as records that are
+        written one per line (see :func:`etb.datalog.engine.logic_records`):
+        first `('claim', claim)` for each (external) claim, then
+        `('goal', goal, annotation)` for each completed (external) goal, where
+        annotation is a dictionary with the kind and status of the
+        annotation, and its claims as indices into the claims.
         """
         filename = 'etb_logic_file'
-        self.log.debug("Save logic state to file {0}".format(filename))
-        # get_claims returns the list of (external) claims
-        # get_goal_results returns the (external) goal to (external) claims dict
-        # get_goal_annotations returns the annotations list corresponding to goal_results
-        all_claims = self.get_claims()
-        all_goals = self.get_goals()
-        annotations = []
-        for goal in all_goals:
-            internal_goal = self.term_factory.mk_literal(goal)
-            ann = self.get_goal_annotation(goal)
-            # For now, only save completed goals
-            if ann is None:
-                self.log.error('goal {0} has no annotations'.format(goal))
-            elif ann.status == graph.Annotation.COMPLETED:
-                # graph.Annotation: not all members are saved.
-                # Assumes completed Annotations for now.
-                # goal and state will be restored when this is loaded
-                # index, subgoalindex, gT, gD, and gUnclosed are not needed for completed
-                aclaims = []
-                for intclaim in ann.claims:
-                    claim = self.term_factory.close_literal(intclaim[0])
-                    fnd = False
-                    for i in range(len(all_claims)):
-                        ilit = all_claims[i].literal
-                        if all_claims[i].literal == claim:
-                            fnd = True
-                            aclaims.append(i)
-                    if not fnd:
-                        self.log.error('save_logic_file: claim {0} from annotation for {1} not in all_claims'
-                                       .format(claim, goal))
-                annot = {'kind': ann.kind, 'claims': aclaims, 'status': ann.status}
-                annotations.append(annot)
-            else:
-                self.log.error('save_logic_file: goal {0} is {1}, not COMPLETED'
-                               .format(goal, ann.print_status()))
-        lstate = [all_claims, all_goals, annotations]
-        # print 'save_logic_file: claims  {0}'.format(all_claims)
-        #print 'save_logic_file: goals   {0}'.format(all_goals)
-        #print 'save_logic_file: annots  {0}'.format(annotations)
-        self.log.info('saved {0} claims and {1} goals in {2}'
-                      .format(len(all_claims), len(all_goals), filename))
+        self.log.debug("Save logic state to file %s", filename)
         kwargs['separators'] = (',',':')  # compact representation
+        dumps = terms.dumps
+        close_literal = self.term_factory.close_literal
         try:
-            with bz2.BZ2File(filename, 'w') as f:
-                terms.dump(lstate, f, *args, **kwargs)
+            with bz2.BZ2File(filename, 'w', compresslevel=SAVE_COMPRESSLEVEL) as f:
+                # the indices of each claim literal, in the order written
+                claim_index = {}
+                nclaims = 0
+                for claim in self.iter_claims():
+                    claim_index.setdefault(claim.literal, []).append(nclaims)
+                    nclaims += 1
+                    f.write(dumps(('claim', claim), *args, **kwargs))
+                    f.write('\n')
+                ngoals = 0
+                for goal in self.get_goals():
+                    ann = self.get_goal_annotation(goal)
+                    # For now, only save completed goals
+                    if ann is None:
+                        self.log.error('goal {0} has no annotations'.format(goal))
+                    elif ann.status == graph.Annotation.COMPLETED:
+                        # graph.Annotation: not all members are saved.
+                        # Assumes completed Annotations for now.
+                        # goal and state will be restored when this is loaded
+                        # index, subgoalindex, gT, gD, and gUnclosed are not needed for completed
+                        aclaims = []
+                        for intclaim in ann.claims:
+                            claim = close_literal(intclaim[0])
+                            indices = claim_index.get(claim)
+                            if indices:
+                                aclaims.extend(indices)
+                            else:
+                                self.log.error('save_logic_file: claim {0} from annotation for {1} not in the claims'
+                                               .format(claim, goal))
+                        annot = {'kind': ann.kind, 'claims': aclaims, 'status': ann.status}
+                        ngoals += 1
+                        f.write(dumps(('goal', goal, annot), *args, **kwargs))
+                        f.write('\n')
+                    else:
+                        self.log.error('save_logic_file: goal {0} is {1}, not COMPLETED'
+                                       .format(goal, ann.print_status()))
+            self.log.info('saved %d claims and %d goals in %s',
+                          nclaims, ngoals, filename)
         except Exception as err:
             self.log.exception('save_logic_file: unable to save file {0}'
                                .format(filename))
@@ -10,21 +10,39 @@ A simple external predicate `less_than` that can be called from an `InterpretSta
 
 """
 
+import re
+
 def less_than(s1, s2):
     """
-    Determine whether `s1` is smaller than `s2`. If they are not, a
-    `ValueError` is thrown.
+    Determine whether `s1` is smaller than `s2`. If one of them does not
+    represent an integer, the result is `False`.
 
     :parameters:
-        - `s1`: a string representing an integer
-        - `s2`: a string representing an integer
+        - `s1`: an integer or a string representing an integer
+        - `s2`: an integer or a string representing an integer
     :returntype:
         `True` or `False`
 
     """
-    try:
-        sint1 = int(s1)
-        sint2 = int(s2)
-        return sint1 < sint2
-    except ValueError:
+    int1 = _to_int(s1)
+    int2 = _to_int(s2)
+    if int1 is None or int2 is None:
         return False
+    return int1 < int2
+
+_INT_RE = re.compile(r'[+-]?[0-9]+$')
+
+def _to_int(s):
+    """
+    The integer `s` represents, or `None` if it does not represent one.
+    Checks the digits first rather than catching the `ValueError` of `int`;
+    only ASCII digits count, as `int` rejects other unicode digits.
+    """
+    if isinstance(s, (int, long)):
+        return s
+    if not isinstance(s, basestring):
+        s = str(s)
+    s = s.strip()
+    if _INT_RE.match(s):
+        return int(s)
+    return None
@@ -31,6 +31,8 @@ import model
 import logging
 import time
 
+from bisect import bisect_left, bisect_right
+
 # Locking
 import threading
 
@@ -47,6 +49,9 @@ class Annotation(object):
     RESOLVED = 2
     COMPLETED = 3
 
+    __slots__ = ['item', 'state', 'kind', 'index', 'subgoalindex', 'claims',
+                 'explanations', 'status', 'goal', 'gT', 'gD', 'gUnclosed']
+
     def __init__(self, item, kind, state):
         """
         Create an `Annotation` object using a particular `item` (a goal or a
@@ -208,7 +213,7 @@ class Annotation(object):
         closed_gT = {}
         for subgoal in self.gT:
             closed_subgoal = term_factory.close_literal(subgoal)
-            closed_clauses = map(lambda clause: term_factory.readable_clause(clause), self.gT[subgoal])
+            closed_clauses = [term_factory.readable_clause(clause) for clause in self.gT[subgoal]]
             closed_gT[closed_subgoal] = closed_clauses
         return closed_gT
 
@@ -258,6 +263,10 @@ class DependencyGraph(object):
               their corresponding annotation.
             - `tau`: used by the closing algorithm; see closing algorithm
               specification.
+            - `goal_indices`, `goal_items`: parallel lists of the `index` and
+              the frozen goal of every goal annotation, sorted by `index`, so
+              the closing algorithm only walks the goals older than a node.
+            - `goal_nodes`: the set of goals in the graph.
 
         """
         # the graph is a dict with keys are the nodes and the value of each
@@ -274,6 +283,10 @@ class DependencyGraph(object):
         self.log = logging.getLogger('etb.datalog.graph')
         # the partial map tau of of goals to a map of goal indices to propagation indices
         self.tau = {}
+        # the goals in the graph sorted by the index of their annotation
+        self.goal_indices = []
+        self.goal_items = []
+        self.goal_nodes = set()
 
         # lock associated with this graph
         self.rlock = threading.RLock()
@@ -289,15 +302,59 @@ class DependencyGraph(object):
     def clear(self):
         """
         Clear the dependency graph by clearing `self.graph`,
-        `self.nodes_to_annotations`, and `self.tau`.
+        `self.nodes_to_annotations`, `self.tau`, and the goal index.
         """
         self.graph.clear()
         self.parents.clear()
         self.nodes_to_annotations.clear()
         self.tau.clear()
+        del self.goal_indices[:]
+        del self.goal_items[:]
+        self.goal_nodes.clear()
+
+    def __index_goal(self, frozen_goal, annotation):
+        # The global time is reset when the logical state is cleared, so
+        # insert rather than append to keep the index sorted.
+        position = bisect_right(self.goal_indices, annotation.index)
+        self.goal_indices.insert(position, annotation.index)
+        self.goal_items.insert(position, frozen_goal)
+        self.goal_nodes.add(frozen_goal)
+
+    def __unindex_goal(self, frozen_goal, annotation):
+        position = bisect_left(self.goal_indices, annotation.index)
+        end = bisect_right(self.goal_indices, annotation.index)
+        while position < end:
+            if self.goal_items[position] == frozen_goal:
+                del self.goal_indices[position]
+                del self.goal_items[position]
+                return
+            position += 1
+
+    def goals_up_to(self, index, inclusive=True):
+        """
+        Get the goals whose annotation has an `index` smaller than (or equal
+        to, if `inclusive`) the given `index`, oldest first.
+
+        :parameters:
+            - `index`: an annotation index
+            - `inclusive` (optional, default is `True`): whether goals with
+              an index equal to `index` are included
+
+        :returntype:
+            a list of frozen goals
+        """
+        if inclusive:
+            return self.goal_items[:bisect_right(self.goal_indices, index)]
+        else:
+            return self.goal_items[:bisect_left(self.goal_indices, index)]
 
     def add_annotation(self, frozen_goal, annotation):
+        old_annotation = self.nodes_to_annotations.get(frozen_goal)
+        if old_annotation is not None and old_annotation.is_goal():
+            self.__unindex_goal(frozen_goal, old_annotation)
         self.nodes_to_annotations[frozen_goal] = annotation
+        if annotation.is_goal():
+            self.__index_goal(frozen_goal, annotation)
 
     def add_goal(self, goal):
         """
@@ -311,7 +368,10 @@ class DependencyGraph(object):
         :returntype:
             `None`
         """
-        frozen_goal = model.freeze(goal)
+        self._add_goal_frozen(model.freeze(goal))
+
+    def _add_goal_frozen(self, frozen_goal):
+        # as add_goal, for a goal that is already frozen
         if not self.__node_is_present(frozen_goal):
             # add node to graph
             self.add_node(frozen_goal)
@@ -320,6 +380,7 @@ class DependencyGraph(object):
             #               .format(self.state.engine.term_factory.close_literal(frozen_goal),
             #                       annotation_goal.print_status()))
             self.nodes_to_annotations[frozen_goal] = annotation_goal
+            self.__index_goal(frozen_goal, annotation_goal)
 
     def add_pending_rule(self, clause):
         """
@@ -350,12 +411,13 @@ class DependencyGraph(object):
         :returntype:
             `None`
         """
-        self.add_goal(goal)
+        frozen_goal = model.freeze(goal)
+        self._add_goal_frozen(frozen_goal)
         assert isinstance(prule, PendingRule)
         assert self.get_annotation(prule)
-        self.graph[model.freeze(goal)].append(prule)
+        self.graph[frozen_goal].append(prule)
         if not prule in self.parents or not self.parents[prule]:
-            self.parents[prule] = [model.freeze(goal)]
+            self.parents[prule] = [frozen_goal]
         else:
             raise
             #self.parents[prule].append(model.freeze(goal))
@@ -393,9 +455,10 @@ class DependencyGraph(object):
         """
         assert(isinstance(prule, PendingRule))
         assert self.get_annotation(prule)
-        self.add_goal(goal)
-        self.graph[prule].append(model.freeze(goal))
-        self.parents[model.freeze(goal)].append(prule)
+        frozen_goal = model.freeze(goal)
+        self._add_goal_frozen(frozen_goal)
+        self.graph[prule].append(frozen_goal)
+        self.parents[frozen_goal].append(prule)
 
     def get_annotation(self, item):
         """
@@ -493,22 +556,23 @@ class DependencyGraph(object):
         """
         if node not in self.tau:
             self.tau[node] = {}
-        for h, h_annot in self.nodes_to_annotations.iteritems():
-            if h_annot and h_annot.is_goal() and h_annot.index <= node_annotation.index:
-                tau_g_h = None
-                for h_prime in node_annotation.gT:
-                    h_prime_annotation = self.get_annotation(h_prime)
-                    if (h_prime_annotation and
-                        (h_prime_annotation.status == Annotation.CLOSED or h_prime_annotation.status == Annotation.COMPLETED) and
-                        node_annotation.gT[h_prime] and
-                        h in h_prime_annotation.gD and
-                        h_prime_annotation.gD[h] is not None):
-                        if tau_g_h is None:
-                            tau_g_h = h_prime_annotation.gD[h]
-                        else:
-                            tau_g_h = min(tau_g_h, h_prime_annotation.gD[h])
-
-                self.tau[node][h] = tau_g_h
+        tau_node = self.tau[node]
+        # the closed subgoals h' with a non-empty gT(h') do not depend on h,
+        # so collect their gD once rather than once per goal h
+        closed_gDs = []
+        for h_prime, gTh_prime in node_annotation.gT.iteritems():
+            h_prime_annotation = self.get_annotation(h_prime)
+            if (h_prime_annotation and
+                (h_prime_annotation.status == Annotation.CLOSED or h_prime_annotation.status == Annotation.COMPLETED) and
+                gTh_prime):
+                closed_gDs.append(h_prime_annotation.gD)
+        for h in self.goals_up_to(node_annotation.index):
+            tau_g_h = None
+            for gD in closed_gDs:
+                gDh = gD.get(h)
+                if gDh is not None and (tau_g_h is None or gDh < tau_g_h):
+                    tau_g_h = gDh
+            tau_node[h] = tau_g_h
 
     def has_subgoal(self, node):
         """Determine whether the node has a subgoal (whether a child of a node
@@ -553,17 +617,20 @@ class DependencyGraph(object):
             if len(j.item.clause) > 1 and not self.has_subgoal(j.item):
                 return False
         # 2
-        for h, h_annotation in self.nodes_to_annotations.iteritems():
-            gTh = []
-            if h in annotation_node.gT:
-                gTh = annotation_node.gT[h]
+        # only goals in the graph that have an entry in gT can fail the test
+        goal_nodes = self.goal_nodes
+        nodes_to_annotations = self.nodes_to_annotations
+        for h, gTh in annotation_node.gT.iteritems():
+            if h not in goal_nodes:
+                continue
+            h_annotation = nodes_to_annotations[h]
 
             index_h_smaller_than_node = False
-            if isinstance(h_annotation, Annotation) and h_annotation.index <= annotation_node.index:
+            if h_annotation.index <= annotation_node.index:
                 index_h_smaller_than_node = True
 
             h_closed = False
-            if isinstance(h_annotation, Annotation) and (h_annotation.status == Annotation.COMPLETED or (h_annotation.status == Annotation.CLOSED and ((not h_annotation.gUnclosed) or h_annotation.gUnclosed <= annotation_node.index))):
+            if (h_annotation.status == Annotation.COMPLETED or (h_annotation.status == Annotation.CLOSED and ((not h_annotation.gUnclosed) or h_annotation.gUnclosed <= annotation_node.index))):
                 h_closed = True
 
             if gTh and not index_h_smaller_than_node and not h_closed:
@@ -650,34 +717,46 @@ class DependencyGraph(object):
 
     def close_node(self, node, annotation_node):
         gd_everywhere_undefined = True
-        for h, h_annot in self.nodes_to_annotations.iteritems():
-            if h_annot and h_annot.is_goal() and h_annot.index < annotation_node.index:
-                if h in annotation_node.gT and annotation_node.gT[h] and not (h_annot.status == Annotation.CLOSED or h_annot.status == Annotation.COMPLETED):
-                    if self.tau[node][h] is None:
-                        annotation_node.gD[h] = len(h_annot.claims)
-                    else:
-                        annotation_node.gD[h] = min(len(h_annot.claims), self.tau[node][h])
+        nodes_to_annotations = self.nodes_to_annotations
+        tau_node = self.tau[node]
+        gT = annotation_node.gT
+        gD = annotation_node.gD
+        CLOSED = Annotation.CLOSED
+        COMPLETED = Annotation.COMPLETED
+        for h in self.goals_up_to(annotation_node.index, inclusive=False):
+            h_annot = nodes_to_annotations[h]
+            h_status = h_annot.status
+            h_closed = h_status == CLOSED or h_status == COMPLETED
+            if not h_closed and gT.get(h):
+                tau_g_h = tau_node[h]
+                if tau_g_h is None:
+                    gD[h] = len(h_annot.claims)
+                else:
+                    gD[h] = min(len(h_annot.claims), tau_g_h)
+                gd_everywhere_undefined = False
+            else:
+                tau_g_h = tau_node.get(h)
+                if tau_g_h and not h_closed:
+                    gD[h] = tau_g_h
                     gd_everywhere_undefined = False
                 else:
-                    if h in self.tau[node] and self.tau[node][h]:
-                        if not (h_annot.status == Annotation.CLOSED or h_annot.status == Annotation.COMPLETED):
-                            annotation_node.gD[h] = self.tau[node][h]
-                            gd_everywhere_undefined = False
-                        else:
-                            annotation_node.gD[h] = None
-                    else:
-                        annotation_node.gD[h] = None
+                    gD[h] = None
         if gd_everywhere_undefined:
             self.transitively_complete(node, annotation_node)
         else:
             self.recompute_unclosed(node, annotation_node)
 
     def transitively_complete(self, node, annotation_node):
+        # iterative so deep dependency chains do not hit the recursion
+        # limit; the COMPLETED status doubles as the visited mark
         annotation_node.status = Annotation.COMPLETED
-        for h in annotation_node.gT:
-            h_annot = self.get_annotation(h)
-            if not h_annot.status == Annotation.COMPLETED:
-                self.transitively_complete(h, h_annot)
+        stack = [annotation_node]
+        while stack:
+            for h in stack.pop().gT:
+                h_annot = self.get_annotation(h)
+                if not h_annot.status == Annotation.COMPLETED:
+                    h_annot.status = Annotation.COMPLETED
+                    stack.append(h_annot)
 
     def close(self):
         """
@@ -691,12 +770,10 @@ class DependencyGraph(object):
         with self:
             if not self.inferencing_clear:
                 self.condition.wait(30)
-            goal_nodes = [n for n in self.nodes_to_annotations.items()
-                          if isinstance(n[0], tuple)]
-            sorted_highest_index_first = sorted(goal_nodes, key=lambda item: item[1].index, reverse=True)
-            for item in sorted_highest_index_first:
-                node = item[0]
-                self.close_goal(node, item[1])
+            nodes_to_annotations = self.nodes_to_annotations
+            # goal_items is already sorted by index
+            for node in reversed(list(self.goal_items)):
+                self.close_goal(node, nodes_to_annotations[node])
 
     def is_immediate_subgoal(self, node1_annotation, node2_annotation):
         """
@@ -743,13 +820,18 @@ class DependencyGraph(object):
                 self.condition.wait(4)
             self.log.debug("Engine completion called, {0} nodes"
                            .format(len(self.nodes_to_annotations)))
-            for node, annotation in self.nodes_to_annotations.iteritems():
+            nodes_to_annotations = self.nodes_to_annotations
+            # only goals are ever CLOSED
+            goal_items = list(self.goal_items)
+            goal_nodes = self.goal_nodes
+            for node in goal_items:
+                annotation = nodes_to_annotations[node]
                 if not self.state.no_stuck_subgoals(node):
                     continue
                 if annotation.status == Annotation.CLOSED:
                     everywhere_undefined = True
-                    for h in self.nodes_to_annotations:
-                        if h in annotation.gD and annotation.gD[h]:
+                    for h, gDh in annotation.gD.iteritems():
+                        if gDh and h in goal_nodes:
                             everywhere_undefined =  False
                             break
                     if everywhere_undefined:
@@ -762,8 +844,9 @@ class DependencyGraph(object):
                             time.sleep(self.state.SLOW_MODE)
                         continue
 
-                    for h, h_annot in self.nodes_to_annotations.iteritems():
-                        if h_annot and self.is_immediate_subgoal(annotation, h_annot) and h_annot.status == Annotation.COMPLETED:
+                    for h in goal_items:
+                        h_annot = nodes_to_annotations[h]
+                        if h_annot.status == Annotation.COMPLETED and self.is_immediate_subgoal(annotation, h_annot):
                             # self.log.info('graph.complete 2: {0} COMPLETED'
                             #               .format(self.state.engine.term_factory.close_literal(h)))
                             annotation.status = Annotation.COMPLETED
@@ -828,7 +911,7 @@ class DependencyGraph(object):
         annotation_goal = self.get_annotation(frozen)
         if not annotation_goal:
             # create annotation if not existing yet
-            self.add_goal(goal)
+            self._add_goal_frozen(frozen)
             annotation_goal = self.get_annotation(frozen)
 
         if isinstance(claim, list):
@@ -186,7 +186,7 @@ def traverse(index):
         index in the first place)
     """
     if isinstance(index, dict):
-        return reduce(lambda x,y: x+y, [traverse(index[c]) for c in index.keys()])
+        return [value for c in index for value in traverse(index[c])]
     else:
         return index
 
@@ -306,7 +306,8 @@ def get_candidate_specializations(index, key):
         elif k[0] == -1:
             k2 = list(k)
             k2.pop(0)
-            return reduce(lambda x,y: x+y, map(lambda c:   iter(node[c],k2), [constant for constant in node.keys() if constant > 0 ]))
+            return [value for constant in node if constant > 0
+                    for value in iter(node[constant], k2)]
         # The argument in the key is a constant: more specific is the same
         # constant.
         else:
@@ -353,15 +354,14 @@ def get_candidate_matchings(index, key):
         elif k[0] == -1:
             k2 = list(k)
             k2.pop(0)
-            return reduce(lambda x,y: x+y, map(lambda c: iter(node[c], k2), node.keys()))
+            return [value for c in node for value in iter(node[c], k2)]
         # The argument in the key is a constant: matching is only that constant
         # _or_ a variable.
         else:
             k2 = list(k)
             arg = k2.pop(0)
-            mm = map(lambda c: iter(node[c],k2),
-                     [d for d in node.keys() if d == arg or d == -1])
-            return reduce(lambda x,y: x+y, mm, [])
+            return [value for d in node if d == arg or d == -1
+                    for value in iter(node[d], k2)]
     normalized_key = [x if x >= 0 else -1 for x in key]
     predicate = normalized_key.pop(0)
     if predicate in index:
@@ -108,13 +108,22 @@ class Inference(object):
 
 
     def lock(self):
-        self.logical_state.goal_dependencies.inferencing_clear = False
-        self.logical_state.goal_dependencies.condition.acquire()
+        goal_dependencies = self.logical_state.goal_dependencies
+        goal_dependencies.inferencing_clear = False
+        goal_dependencies.condition.acquire()
 
     def unlock(self):
-        self.logical_state.goal_dependencies.condition.notifyAll()
-        self.logical_state.goal_dependencies.inferencing_clear = True
-        self.logical_state.goal_dependencies.condition.release()
+        goal_dependencies = self.logical_state.goal_dependencies
+        condition = goal_dependencies.condition
+        condition.notifyAll()
+        goal_dependencies.inferencing_clear = True
+        condition.release()
+
+    def __enter__(self):
+        self.lock()
+
+    def __exit__(self, t, v, tb):
+        self.unlock()
 
     def notify(self):
         self.logical_state.goal_dependencies.condition.notify()
@@ -156,7 +165,8 @@ class Inference(object):
         annotation_claim = self.logical_state.db_get_annotation(prule)
         self.log.debug('inference.resolve_claim: annotation_claim({0}) = {1}'
                        .format(prule, annotation_claim))
-        if annotation_claim:
+        # a claim that is not attached to any goal has nothing to resolve
+        if annotation_claim and annotation_claim.goal is not None:
             claim_goal = annotation_claim.goal
             self.log.debug('inference.resolve_claim: claim_goal: {0}'.format(claim_goal))
             fgoal = model.freeze(claim_goal)
@@ -500,18 +510,60 @@ class Inference(object):
         We add the `claims` atomatically to the `Inference` object. The fact
         that this atomatically ensures that any closing or completing algorithm
         does not conclude too early that the goal is completed (we want all
-        claims to already have arrived at the subgoal). Each claim gets added
-        using :func:`etb.datalog.inference.Inference.add_claim`.
+        claims to already have arrived at the subgoal).
+
+        Each claim is stored once and then attached to every goal (done or
+        stuck) it is a solution for, as
+        :func:`etb.datalog.inference.Inference.add_rule` does for rules; a
+        stuck goal that receives a claim is no longer stuck. A claim that is
+        already known is not stored again but is still attached to the goals
+        that do not have it yet, and a claim repeated within `claims` is only
+        considered once.
 
         :parameters:
-            - `claims`: a list of claims, where each claim is a list consisting
-              of 1 literal (a list of integers).
+            - `claims`: a list of pairs, where the first item of the pair is
+              an internal literal (a list of integers) or a
+              `graph.PendingRule` with one literal, and the second item is its
+              explanation.
 
         :returntype:
             `None`
         """
-        for item in claims:
-            self.add_claim(item[0], item[1])
+        logical_state = self.logical_state
+        seen = set()
+        for (claim, explanation) in claims:
+            if isinstance(claim, graph.PendingRule):
+                literal = claim.clause[0]
+            else:
+                literal = model.freeze(claim)
+                claim = None
+            if literal in seen:
+                continue
+            seen.add(literal)
+            known_claim = logical_state.db_get_claim_with_literal(literal)
+            if known_claim:
+                claim = known_claim
+                explanation = logical_state.db_get_explanation(claim)
+            else:
+                if claim is None:
+                    claim = logical_state.db_add_pending_rule([literal])
+                logical_state.db_add_clause(claim, explanation)
+                logical_state.db_add_claim(claim)
+            self.notify()
+            # First the done goals, then the stuck goals
+            for goals_index, stuck in ((logical_state.db_goals, False),
+                                       (logical_state.db_stuck_goals, True)):
+                candidate_goals = index.get_candidate_generalizations(goals_index, literal)
+                for goal in candidate_goals:
+                    if not model.is_substitution(model.get_unification_l(literal, goal)):
+                        continue
+                    annotation = logical_state.db_get_annotation(goal)
+                    if annotation and claim.clause in annotation.claims:
+                        continue
+                    self.update_goal(claim, goal)
+                    self.resolve_claim(claim, explanation)
+                    if stuck:
+                        self.move_stuck_goal_to_goal(goal)
 
     def add_error(self, goal, error, explanation):
         """
@@ -636,6 +688,23 @@ class Inference(object):
                 if result:
                     self.move_stuck_goal_to_goal(candidate)
 
+    def add_rules(self, rules):
+        """
+        Add a list of KB `rules` in one go, as
+        :func:`etb.datalog.inference.Inference.add_claims` does for claims.
+        Each rule gets added using :func:`etb.datalog.inference.Inference.add_rule`.
+
+        :parameters:
+            - `rules`: a list of pairs, where the first item of the pair is an
+              internal representation of a rule and the second item is its
+              explanation.
+
+        :returntype:
+            `None`
+        """
+        for item in rules:
+            self.add_rule(item[0], item[1])
+
     def move_stuck_goal_to_goal(self, goal):
         self.logical_state.db_move_stuck_goal_to_goal(goal)
         self.set_goal_to_resolved(goal)
@@ -729,7 +798,6 @@ class Inference(object):
         else:  #then subgoal must be set
             self.log.debug('inference:subgoal: {0} from pending rule: {1}'.format(subgoal, rule))
             self.logical_state.db_add_pending_rule_to_goal(prule, subgoal)
-            fsubgoal = model.freeze(subgoal)
             self.updategT(subgoal, prule)
 
             # The goal dependencies graph has been updated at this point: unlock
@@ -751,6 +819,17 @@ class Inference(object):
             self.engine.close()
         return prule
 
+    def add_pending_rules(self, rules, explanation, parent_goal):
+        """
+        Add a list of pending `rules` that share the same `explanation` and
+        `parent_goal`. Each rule gets added using
+        :func:`etb.datalog.inference.Inference.add_pending_rule`.
+
+        :returntype:
+            a list with, for each rule, `None` or a `graph.PendingRule`
+        """
+        return [self.add_pending_rule(rule, explanation, parent_goal) for rule in rules]
+
     def propagate_claims(self, subgoal, prule):
         """
         Applies the propagate rule to propagate any existing claims from an
@@ -762,7 +841,6 @@ class Inference(object):
                       .format(self.term_factory.close_literals(prule.clause)))
         fsubgoal = model.freeze(subgoal)
         annotation_subgoal = self.logical_state.db_get_annotation(fsubgoal)
-        fclause = prule.clause
         subgoal_index = self.logical_state.goal_dependencies.get_subgoal_index(prule)
         self.log.debug('inference.propagate_claims: annotation_subgoal = {0}, subgoal_index = {1}'.format(annotation_subgoal, subgoal_index))
         if annotation_subgoal:
@@ -791,13 +869,17 @@ class Inference(object):
 
         """
         stuck_goals = self.logical_state.db_get_all_stuck_goals()
+        # Only goals on one of the newpreds can be sent to the interpret_state
+        interpret = self.interpret_state and newpreds
         for goal in stuck_goals:
 
-            external_goal = self.term_factory.close_literal(goal)
-
-            if (external_goal.first_symbol() in newpreds and
-                self.interpret_state and
-                self.interpret_state.is_interpreted(external_goal)):
+            if interpret:
+                external_goal = self.term_factory.close_literal(goal)
+                interpret_goal = (external_goal.first_symbol() in newpreds and
+                                  self.interpret_state.is_interpreted(external_goal))
+            else:
+                interpret_goal = False
+            if interpret_goal:
                 self.interpret_state.interpret_goal_somewhere(external_goal, goal, self.engine)
                 # no need to put on stuck as it is already stuck
                 # self.resolve_goal_with_existing_claims(goal)
@@ -1022,7 +1104,6 @@ class Inference(object):
             pgoal = self.logical_state.is_renaming_present_of_goal(goal)
             if pgoal:
                 annotation = self.logical_state.db_get_annotation(pgoal)
-                pannotation = self.logical_state.db_get_annotation(goal)
             else:
                 annotation = self.logical_state.db_get_annotation(goal)
             if annotation:
@@ -31,6 +31,9 @@ import logging
 
 
 
+# The number of Literals TermFactory.mk_literal remembers by identity
+RECENT_LITERALS_SIZE = 4096
+
 class TermFactory(object):
     def __init__(self):
         """
@@ -58,6 +61,11 @@ class TermFactory(object):
         # integers when seeing new Terms.
         self.__literal_to_internal = {}
         self.__internal_to_literal = {}
+        # Literals recently given to mk_literal, by id, with their internal
+        # representation. Clients tend to ask for the same Literal object
+        # over and over (e.g., when polling a goal), and this avoids hashing
+        # it each time. The Literal is kept so that its id is not reused.
+        self.__recent_literals = {}
         self.log = logging.getLogger('etb.datalog.termfactory')
 
     def show_index(self):
@@ -78,6 +86,7 @@ class TermFactory(object):
         self.__s_to_i.clear()
         self.__literal_to_internal.clear()
         self.__internal_to_literal.clear()
+        self.__recent_literals.clear()
         self.__const_count = 1
         self.__var_count = -1
 
@@ -195,21 +204,21 @@ class TermFactory(object):
         assert isinstance(predicate, (terms.StringConst, terms.IdConst)),\
             'predicate {0} (type {1}) is not a terms.StringConst in create_fresh_literal'\
                 .format(predicate, type(predicate))
+        s_to_i = self.__s_to_i
         self.add_const(predicate)
-        internal_predicate = self.get_int(predicate)
-
-        internal_literal = [internal_predicate]
+        internal_literal = [s_to_i[predicate]]
         # add each of the arguments (note that "add" means only add when not
         # present yet)
         for arg in arguments:
-            if arg.is_var():
-                self.add_var(arg)
-            if arg.is_const():
-                self.add_const(arg)
-            else: # in all other cases treat the argument as a constant symbol
-                # (also lists for example)
-                self.add_const(arg)
-            internal_literal += [self.get_int(arg)]
+            i = s_to_i.get(arg)
+            if i is None:
+                if arg.is_var():
+                    self.add_var(arg)
+                else: # in all other cases treat the argument as a constant symbol
+                    # (also lists for example)
+                    self.add_const(arg)
+                i = s_to_i[arg]
+            internal_literal.append(i)
 
         return internal_literal
 
@@ -228,6 +237,9 @@ class TermFactory(object):
 
         """
         assert isinstance(lit, terms.Literal), 'lit is not a terms.Literal in TermFactory.mk_literal'
+        recent = self.__recent_literals.get(id(lit))
+        if recent is not None and recent[0] is lit:
+            return recent[1]
         internal_literal = self.__literal_to_internal.get(lit.hashcons())
         #self.log.debug('model.mk_literal: external_literal: {0}, internal_literal0: {1}'.format(lit, internal_literal))
         # if the literal was not seen before, it's new
@@ -235,8 +247,33 @@ class TermFactory(object):
             internal_literal = self.create_fresh_literal(lit)
             self.__literal_to_internal[lit.hashcons()] = internal_literal
             self.__internal_to_literal[tuple(internal_literal)] = lit
+        if len(self.__recent_literals) >= RECENT_LITERALS_SIZE:
+            self.__recent_literals.clear()
+        self.__recent_literals[id(lit)] = (lit, internal_literal)
         return internal_literal
 
+    def mk_literals(self, lits):
+        """
+        Call :func:`etb.datalog.model.TermFactory.mk_literal` on each literal
+        in `lits`. Literals the `TermFactory` already knows are looked up
+        directly; only new ones go through `mk_literal`.
+
+        :parameters:
+            - `lits`: a list of :class:`etb.terms.Literal`
+
+        :returntype:
+            a list of internal literals (i.e., a list of lists of integers)
+
+        """
+        known = self.__literal_to_internal.get
+        internal_literals = []
+        for lit in lits:
+            internal_literal = known(lit.hashcons())
+            if not internal_literal:
+                internal_literal = self.mk_literal(lit)
+            internal_literals.append(internal_literal)
+        return internal_literals
+
     def mk_clause(self, clause):
         """
         Create an internal representation for a :class:`etb.terms.Clause`. We
@@ -252,8 +289,7 @@ class TermFactory(object):
         """
         assert isinstance(clause, terms.Clause), 'clause is not a terms.Clause in mk_clause'
         internal_clause = [self.mk_literal(clause.head)]
-        for body_literal in clause.body:
-            internal_clause += [self.mk_literal(body_literal)]
+        internal_clause.extend(self.mk_literals(clause.body))
         return internal_clause
 
     def open_literal(self, term):
@@ -306,7 +342,8 @@ class TermFactory(object):
         :returntype:
             a list of :class:`etb.terms.Term` instances
         """
-        return map(lambda literal: self.close_literal(literal), internal_literals)
+        close_literal = self.close_literal
+        return [close_literal(literal) for literal in internal_literals]
 
     def readable_clause(self, internal_literals):
         """
@@ -326,11 +363,7 @@ class TermFactory(object):
             internal_literals = internal_literals.clause
         if internal_literals is None:
             return "None"
-        list_of_terms = self.close_literals(internal_literals)
-        if len(list_of_terms) == 1:
-            return str(list_of_terms[0]) + "."
-        else:
-            return str(list_of_terms[0]) +  " :- " + ",".join(map(lambda literal: str(literal), list_of_terms[1:]))
+        return readable_terms(self.close_literals(internal_literals))
 
     def close_explanation(self, internal_explanation):
         """
@@ -412,7 +445,7 @@ def is_ground(literal):
     :returntype:
         `True` or `False`
     """
-    return all( map(lambda x: x > 0, literal) )
+    return all(x > 0 for x in literal)
 
 
 def offset(clause):
@@ -811,6 +844,22 @@ def get_goal_from_explanation(internal_explanation):
     assert is_top_down_explanation(internal_explanation), 'internal_explanation is not a top down explanation in get_goal_from_explanation'
     return internal_explanation[2]
 
+def readable_terms(list_of_terms):
+    """
+    Produce a string out of a list of terms that is assumed to represent a
+    clause: the head, followed by `:-` and the body if there is one.
+
+    :parameters:
+        - `list_of_terms`: a list of :class:`etb.terms.Term` instances
+
+    :returntype:
+        a string
+    """
+    if len(list_of_terms) == 1:
+        return '%s.' % (list_of_terms[0],)
+    return '%s :- %s' % (list_of_terms[0],
+                         ','.join([str(literal) for literal in list_of_terms[1:]]))
+
 def freeze_clause(clause):
     """
     Freeze the `clause` to be able to use it as keys in dictionaries, for example
@@ -1062,6 +1111,25 @@ class LogicalState(object):
         assert(isinstance(prule, graph.PendingRule))
         return index.in_index(self.db_claims, prule.clause[0], prule)
 
+    def db_get_claim_with_literal(self, literal):
+        """
+        Get the claim for `literal` from `db_claims`, if present. Unlike
+        :func:`etb.datalog.model.LogicalState.db_mem_claim`, this compares
+        the literals of the claims rather than the `graph.PendingRule`
+        instances.
+
+        :parameters:
+            `literal`: a tuple of integers
+
+        :returntype:
+            a `graph.PendingRule`, or `None` if there is no such claim
+        """
+        with self:
+            for claim in index.get_candidate_specializations(self.db_claims, literal):
+                if claim.clause[0] == literal:
+                    return claim
+            return None
+
     def db_add_clause(self, prule, explanation):
         """
         Add a `clause` to the DB. The `explanation` is of the form
@@ -1124,6 +1192,39 @@ class LogicalState(object):
             # Also add it to the Goal Dependencies graph
             self.goal_dependencies.add_goal(goal)
 
+    def db_add_goals_with_annotations(self, goals, annotations, claims):
+        """
+        Add a batch of `goals` to the DB as in
+        :func:`etb.datalog.model.LogicalState.db_add_goal`, and restore
+        their `annotations` in the `goal_dependencies`. All goals are added
+        while holding the lock once.
+
+        :parameters:
+            - `goals`: a list of internal literals
+            - `annotations`: a list of dictionaries, one per goal, of the form
+              `{'kind': kind, 'claims': indices, 'status': status}`
+            - `claims`: a list of internal literals; the `indices` of an
+              annotation refer to this list
+
+        :returntype:
+            `None`
+        """
+        db_goals = self.db_goals
+        goal_dependencies = self.goal_dependencies
+        add_goal = goal_dependencies.add_goal
+        add_annotation = goal_dependencies.add_annotation
+        Annotation = graph.Annotation
+        with self:
+            for goal, annot in zip(goals, annotations):
+                if not index.in_index(db_goals, goal, goal):
+                    index.add_to_index(db_goals, goal, goal)
+                fgoal = freeze(goal)
+                add_goal(fgoal)
+                annotation = Annotation(fgoal, annot['kind'], self)
+                annotation.claims = [[claims[i]] for i in annot['claims']]
+                annotation.status = annot['status']
+                add_annotation(fgoal, annotation)
+
     def db_add_goal_to_pending_rule(self, goal, rule):
         """
         Add `goal` as a successor of `rule` to the `goal_dependencies`.
@@ -1340,7 +1441,7 @@ class LogicalState(object):
             a list of :class:`etb.terms.Term` instances
 
         """
-        return map(lambda claim: termfactory.close_literal(claim[0]), self.db_get_all_claims())
+        return [termfactory.close_literal(claim[0]) for claim in self.db_get_all_claims()]
 
     def db_get_goals_index(self):
         """
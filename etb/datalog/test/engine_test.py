@@ -90,6 +90,25 @@ class TestEngine(unittest.TestCase):
         #self.engine.add_claim(claim)
         self.assertItemsEqual([returned_claim], self.engine.get_claims())
 
+    def test_add_claims(self):
+        self.engine.clear()
+        self.engine.term_factory.clear()
+        claim = terms.Claim(self.pab, model.create_external_explanation())
+        # a new claim without a matching goal is only stored
+        self.engine.add_claims([claim])
+        self.assertItemsEqual([self.pab], [c.literal for c in self.engine.get_claims()])
+        # a new claim for a goal is added to the claims of that goal
+        self.engine.add_goal(self.qXY)
+        self.engine.add_claims([terms.Claim(self.qab, model.create_external_explanation())])
+        self.assertItemsEqual([self.qab], [c.literal for c in self.engine.get_claims_matching_goal(self.qXY)])
+        # a claim for a stuck goal unsticks it, also when the claim is known
+        self.engine.add_goal(self.gt_4_2)
+        self.assertTrue(self.engine.is_stuck_goal(self.gt_4_2))
+        gt_claim = terms.Claim(self.gt_4_2, model.create_external_explanation())
+        self.engine.add_claims([gt_claim, gt_claim])
+        self.assertFalse(self.engine.is_stuck_goal(self.gt_4_2))
+        self.assertItemsEqual([self.gt_4_2], [c.literal for c in self.engine.get_claims_matching_goal(self.gt_4_2)])
+
     # def test_add_goal(self):
     #     self.engine.clear()
     #     self.engine.add_goal(self.gt_4_2)
@@ -141,7 +160,24 @@ class TestEngine(unittest.TestCase):
         self.engine.add_pending_rule(pending_rule, external_goal=self.qab)
         self.assertItemsEqual([self.qab], map(lambda claim: claim.literal, self.engine.get_claims()))
 
+    def test_add_pending_rules_that_are_claims(self):
+        self.engine.clear()
+        pbc = parser.parse_literal('p(b, c)')
+        self.engine.add_pending_rules([terms.Clause(self.pab, []),
+                                       terms.Clause(pbc, [])],
+                                      self.pXY)
+        self.assertItemsEqual([self.pab, pbc], map(lambda claim: claim.literal, self.engine.get_claims()))
+
+
 
+    def test_logic_records(self):
+        claim = terms.Claim(self.pab, model.create_external_explanation())
+        annot = {'kind': 'goal', 'claims': [0], 'status': 0}
+        # a whole state, as in older logic state files
+        records = list(engine.logic_records([[[claim], [self.pXY], [annot]]]))
+        self.assertEqual([('claim', claim), ('goal', self.pXY, annot)], records)
+        # records are passed on
+        self.assertEqual(records, list(engine.logic_records(records)))
 
     def test_interpret(self):
         self.engine.clear()
@@ -193,6 +229,10 @@ class TestEngine(unittest.TestCase):
         cl6 = parser.parse_literal('same_clique(1, 5)')
         self.engine.add_goal(goal)
         self.assertItemsEqual([cl1, cl2, cl3, cl4, cl5, cl6], map(lambda claim: claim.literal, self.engine.get_claims_matching_goal(goal)))
+        # asking again reuses the claims built the first time
+        claims = self.engine.get_claims_matching_goal(goal)
+        self.assertEqual(claims, self.engine.get_claims_matching_goal(goal))
+        self.assertIsNot(claims, self.engine.get_claims_matching_goal(goal))
 
     def test_get_substitutions(self):
         self.engine.clear()
@@ -206,6 +246,10 @@ class TestEngine(unittest.TestCase):
         subst2 = parser.parse('subst(X = b, Y = c)', 'subst')
         subst3 = parser.parse('subst(X = a, Y = c)', 'subst')
         self.assertItemsEqual([subst1, subst2, subst3], self.engine.get_substitutions(self.pathXY))
+        # a ground goal only has the empty substitution
+        pathac = parser.parse_literal('path(a, c)')
+        self.engine.add_goal(pathac)
+        self.assertEqual([terms.Subst()], self.engine.get_substitutions(pathac))
 
     # def test_entailed_program2_groundliterals(self):
     #     self.engine.clear()
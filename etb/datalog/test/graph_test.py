@@ -93,6 +93,54 @@ class TestGraph(unittest.TestCase):
 
         self.assertFalse(self.graph.can_close_to_goal_be_applied(model.freeze(node), annotation_node))
 
+    def test_goals_up_to(self):
+        self.graph.clear()
+        goal1 = [1,2,3]
+        goal2 = [2,3,4]
+        self.graph.add_goal(goal1)
+        self.graph.add_pending_rule([[1,2,-1],[2,3,5]])
+        self.graph.add_goal(goal2)
+        annotation2 = self.graph.get_annotation(model.freeze(goal2))
+        self.assertEqual([model.freeze(goal1), model.freeze(goal2)],
+                         self.graph.goals_up_to(annotation2.index))
+        self.assertEqual([model.freeze(goal1)],
+                         self.graph.goals_up_to(annotation2.index, inclusive=False))
+        # replacing an annotation moves the goal to its new index
+        annotation1 = graph.Annotation(model.freeze(goal1), graph.Annotation.GOAL, self.logical_state)
+        self.graph.add_annotation(model.freeze(goal1), annotation1)
+        self.assertEqual([model.freeze(goal2), model.freeze(goal1)],
+                         self.graph.goals_up_to(annotation1.index))
+
+    def test_transitively_complete(self):
+        self.graph.clear()
+        goals = [model.freeze([1,2,i]) for i in range(5000)]
+        for goal in goals:
+            self.graph.add_goal(goal)
+        annotations = [self.graph.get_annotation(goal) for goal in goals]
+        # a long chain that loops back to the first goal
+        for annotation, goal in zip(annotations, goals[1:] + goals[:1]):
+            annotation.gT[goal] = []
+        self.graph.transitively_complete(goals[0], annotations[0])
+        for annotation in annotations:
+            self.assertEqual(annotation.status, graph.Annotation.COMPLETED)
+
+    def test_update_tau(self):
+        self.graph.clear()
+        goals = [model.freeze([1,2,i]) for i in range(4)]
+        for goal in goals:
+            self.graph.add_goal(goal)
+        h, h1, h2, node = [self.graph.get_annotation(goal) for goal in goals]
+        node.gT[goals[1]] = [[[4,5,6],[7,8,9]]]
+        node.gT[goals[2]] = [[[4,5,6],[7,8,9]]]
+        h1.status = graph.Annotation.CLOSED
+        h1.gD[goals[0]] = 2
+        h2.status = graph.Annotation.COMPLETED
+        h2.gD[goals[0]] = 1
+        self.graph.update_tau(goals[3], node)
+        # tau(g)(h) is the minimum of gD(h) over the closed subgoals
+        self.assertEqual(self.graph.tau[goals[3]][goals[0]], 1)
+        self.assertEqual(self.graph.tau[goals[3]][goals[3]], None)
+
 
 
 
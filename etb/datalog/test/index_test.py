@@ -76,6 +76,10 @@ class TestIndex(unittest.TestCase):
         self.assertEqual(['2', '1'], index.get_candidate_specializations(i, [1,-1,2]))
         self.assertEqual(['4'], index.get_candidate_specializations(i, [1,-1,3]))
         self.assertEqual([], index.get_candidate_specializations(i, [1,-1,5]))
+        # only a variable below the predicate: no specializations
+        j = {}
+        index.add_to_index(j, [1,-1],"5")
+        self.assertEqual([], index.get_candidate_specializations(j, [1,-1]))
 
     def test_get_candidate_matchings(self):
         i = {}
@@ -81,6 +81,30 @@ class TestInference(unittest.TestCase):
         claims = list({iclaim.clause[0] for iclaim in self.inference.get_claims()})
         self.assertItemsEqual([self.i_claim], claims)
 
+    def test_add_claims(self):
+        # known and repeated claims are only stored once
+        self.logical_state.clear()
+        self.inference.lock()
+        self.inference.add_claim(self.i_fact, None)
+        self.inference.add_claims([(list(self.i_claim), None), (list(self.i_claim), None)])
+        self.inference.unlock()
+        claims = [iclaim.clause[0] for iclaim in self.inference.get_claims()]
+        self.assertItemsEqual([self.i_claim], claims)
+
+    def test_add_claims_new(self):
+        # a new claim is attached to the goal it solves
+        self.logical_state.clear()
+        i_claim2 = model.freeze(self.i_goal2)
+        self.inference.lock()
+        self.logical_state.db_add_goal(self.i_goal)
+        self.inference.add_claims([(list(self.i_claim), model.create_external_explanation()),
+                                   (list(i_claim2), model.create_external_explanation())])
+        self.inference.unlock()
+        claims = [iclaim.clause[0] for iclaim in self.inference.get_claims()]
+        self.assertItemsEqual([self.i_claim, i_claim2], claims)
+        goal_claims, _ = self.inference.get_claims_matching_goal(self.i_goal)
+        self.assertEqual([(self.i_claim,)], goal_claims)
+
     def test_add_pending_rule(self):
         self.logical_state.clear()
         self.inference.lock()
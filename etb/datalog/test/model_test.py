@@ -94,6 +94,24 @@ class TestModel(unittest.TestCase):
         # should not be added twice
         self.assertEqual(internal_literal2, internal_literal)
 
+    def test_mk_literal_after_clear(self):
+        self.tf.clear()
+        term1 = parser.parse_literal('p(a, X)')
+        term2 = parser.parse_literal('q(b)')
+        self.assertEqual([1,2,-1], self.tf.mk_literal(term1))
+        self.tf.clear()
+        self.assertEqual([1,2], self.tf.mk_literal(term2))
+        # term1 should not come back with its old representation
+        self.assertEqual([3,4,-1], self.tf.mk_literal(term1))
+
+    def test_mk_literals(self):
+        self.tf.clear()
+        term1 = parser.parse_literal('p(a, X)')
+        term2 = parser.parse_literal('q(X, b)')
+        internal_literals = self.tf.mk_literals([term1, term2, term1])
+        self.assertEqual([[1,2,-1], [3,-1,4], [1,2,-1]], internal_literals)
+        self.assertEqual(self.tf.mk_literal(term2), internal_literals[1])
+
     def test_mk_clause(self):
         self.tf.clear()
 
@@ -144,6 +162,7 @@ class TestModel(unittest.TestCase):
         clause = terms.Clause(qab, [pXY, iXb])
         internals = self.tf.mk_clause(clause)
         self.assertEqual("q(a, b) :- p(X, Y),i(X, b)", self.tf.readable_clause(internals))
+        self.assertEqual("q(a, b).", model.readable_terms([qab]))
 
     def test_close_explanation(self):
         X = terms.mk_var("X")
@@ -448,6 +467,18 @@ class TestModel(unittest.TestCase):
         frozen = model.freeze(internal_literal)
         self.assertTrue(frozen in self.logical_state.goal_dependencies.nodes_to_annotations)
 
+    def test_db_add_goals_with_annotations(self):
+        qab = parser.parse_literal('q(a, b)')
+        pab = parser.parse_literal('p(a, b)')
+        int1 = self.tf.mk_literal(qab)
+        int2 = self.tf.mk_literal(pab)
+        annot = {'kind': graph.Annotation.GOAL, 'claims': [0], 'status': graph.Annotation.RESOLVED}
+        self.logical_state.db_add_goals_with_annotations([int1], [annot], [int2])
+        self.assertTrue(int1 in index.get_candidate_specializations(self.logical_state.db_goals,int1))
+        annotation = self.logical_state.goal_dependencies.nodes_to_annotations[model.freeze(int1)]
+        self.assertEqual([[int2]], annotation.claims)
+        self.assertEqual(graph.Annotation.RESOLVED, annotation.status)
+
     def test_db_add_goal_to_pending_rule(self):
         qab = parser.parse_literal('q(a, b)')
         pab = parser.parse_literal('p(a, b)')
@@ -18,7 +18,7 @@ This module defines the interface.
    <http://www.gnu.org/licenses/>.
 '''
 
-import os, sys, shutil, subprocess, codecs, threading
+import os, sys, shutil, subprocess, codecs, threading, hashlib
 import logging
 import dirsync
 
@@ -176,12 +176,13 @@ class ETBGIT(object):
         '''
         return os.path.join(self.git_dir, etb_path)
 
-    def put(self, src, dst):
+    def put(self, src, dst, commit=True):
         '''
         Add src to the repo under dst. src and dst should be absolute
         paths, src in the local filesystem, dst in the ETB filesystem
 
-        Return the fileref of the newly created file.
+        Return the fileref of the newly created file.  If commit is
+        False, the file is only staged (see register).
         '''
 
         if not os.path.exists(src):
@@ -200,12 +201,20 @@ class ETBGIT(object):
                     and shutil._samefile(src, gitfile)):
                 shutil.copy2(src, gitfile)
 
-        return self.register(dst)
+        return self.register(dst, commit)
 
-    def register(self, dst):
+    def register(self, dst, commit=True):
+        '''
+        Add dst to the repo and return its fileref.  If commit is False,
+        the file is only added to the index, and its sha1 is computed
+        here rather than asked to git; it is committed along with the
+        next committed file.
+        '''
         gitfile = self._make_local_path(dst)
         try:
             self._git_call('add', dst)
+            if not commit:
+                return { 'file': dst, 'sha1': self._blob_sha1(gitfile) }
             # This causes problems if a file is already there
             # self._git_call('commit', '-m', 'ETB commit')
             self._git_commit()
@@ -216,6 +225,16 @@ class ETBGIT(object):
         except Exception as err:
             self.log.error("Unable to add {0} to repo: {1}" . format(dst, err))
 
+    @staticmethod
+    def _blob_sha1(path):
+        '''
+        The sha1 of the git blob for the contents of path.  All files
+        are binary (see .gitattributes), so this is the sha1 git computes.
+        '''
+        with open(path, 'rb') as fd:
+            contents = fd.read()
+        return hashlib.sha1('blob %d\0' % len(contents) + contents).hexdigest()
+
     def get(self, src, dst=None):
         '''
         Get a file from the repo into the local file system.
@@ -19,7 +19,7 @@ but also which goals have been interpreted.
    <http://www.gnu.org/licenses/>.
 """
 
-import os, threading, sys, traceback
+import os, threading, sys, traceback, types
 import terms, wrapper
 import logging, inspect
 
@@ -229,7 +229,7 @@ class InterpretState(object):
 
         if isinstance(output, wrapper.Result):  # includes Errors
             self._handle_output_new_api(goal, internal_goal, output)
-        elif isinstance(output, list) or isinstance(output, dict):
+        elif isinstance(output, (list, dict, types.GeneratorType)):
             self._process_output(goal, output)
         else:
             self.log.error('ETB wrapper returned {0}: only return (lists of) substitutions'.format(type(output)))
@@ -255,37 +255,38 @@ class InterpretState(object):
         else:
             # Success, Substitutions, or Lemmata
             # Note that claims are ignored in this case
-            for r in rules : 
-                self.log.debug('Adding new rule: {0} with goal {1}'.format(r, goal))
-                self.etb.engine.add_pending_rule(r, goal, internal_goal)
+            self.log.debug('Adding new rules: {0} with goal {1}'.format(rules, goal))
+            self.etb.engine.add_pending_rules(rules, goal, internal_goal)
             self.add_results(goal, [])
 
     def _process_output(self, goal, output):
         self.log.debug('_process_output: goal = %s output = %s' % (goal, output))
-        if not output:
-            self.etb.engine.push_no_solutions(goal)
-        else:
-            for obj in output:
-                if isinstance(obj, terms.Claim):
-                    pred = obj.literal.get_pred()
-                    if pred == terms.IdConst('error'):
-                        self.etb.engine.add_errors(goal, [obj])
-                    else:
-                        # claim = terms.Claim(obj.literal, obj.reason)
-                        igoal = self.etb.engine.term_factory.mk_literal(goal)
-                        self.etb.engine.inference_state.set_goal_to_resolved(igoal)
-                        prule = terms.InferenceRule(obj.literal, [], temp=True)
-                        self.log.info('_process_output: reason = {0}'.format(obj.reason))
-                        self.etb.engine.add_pending_rule(prule, goal, igoal)
-                        #self.etb.engine.add_claim(prule, obj.reason)
+        # output may be a generator, so it is only iterated over once
+        empty = True
+        for obj in output:
+            empty = False
+            if isinstance(obj, terms.Claim):
+                pred = obj.literal.get_pred()
+                if pred == terms.IdConst('error'):
+                    self.etb.engine.add_errors(goal, [obj])
                 else:
-                    if isinstance(obj, dict):
-                        obj = terms.Subst(obj)
-                        fact = obj(goal)
-                        self.log.debug('fact: {0}'.format(fact))
-                        # we add the ground goal to the claims of the engine
-                        claim = terms.Claim(fact, model.create_external_explanation())
-                        self.etb.engine.add_claim(claim)
+                    # claim = terms.Claim(obj.literal, obj.reason)
+                    igoal = self.etb.engine.term_factory.mk_literal(goal)
+                    self.etb.engine.inference_state.set_goal_to_resolved(igoal)
+                    prule = terms.InferenceRule(obj.literal, [], temp=True)
+                    self.log.info('_process_output: reason = {0}'.format(obj.reason))
+                    self.etb.engine.add_pending_rule(prule, goal, igoal)
+                    #self.etb.engine.add_claim(prule, obj.reason)
+            else:
+                if isinstance(obj, dict):
+                    obj = terms.Subst(obj)
+                    fact = obj(goal)
+                    self.log.debug('fact: {0}'.format(fact))
+                    # we add the ground goal to the claims of the engine
+                    claim = terms.Claim(fact, model.create_external_explanation())
+                    self.etb.engine.add_claim(claim)
+        if empty:
+            self.etb.engine.push_no_solutions(goal)
 
     #  --------- API -------
     
@@ -648,7 +648,12 @@ class StringConst(Const):
         if text == u"dummy":
             raise ValueError(text)
         Term.__init__(self)
-        self.val = text.encode('utf8')
+        # Byte strings (e.g. tool outputs) are kept as they are; encoding
+        # them would first decode them as ascii.
+        if isinstance(text, str):
+            self.val = text
+        else:
+            self.val = text.encode('utf8')
     def __eq__(self, other):
         if isinstance(other, StringConst):
             return hash(self) == hash(other) and self.val == other.val
@@ -662,7 +667,7 @@ class StringConst(Const):
         else:
             return isinstance(other, Array) or isinstance(other, Map)
     def __repr__(self):
-        return '"{0}"'.format(self.val.encode('utf8'))
+        return '"{0}"'.format(self.val)
     def __hash__(self):
         self._hash = hash(self.val)
         return self._hash
@@ -792,7 +797,10 @@ class Array(Term):
         else:
             return isinstance(other, Map)
     def __hash__(self):
-        self._hash = hash(self.elems)
+        # Terms are immutable, and the hash is checked first by all
+        # __eq__ methods, so compute it only once.
+        if self._hash is None:
+            self._hash = hash(self.elems)
         return self._hash
     def __repr__(self):
         return repr(list(self.elems))
@@ -867,7 +875,8 @@ class Map(Term):
         return (isinstance(other, Map)
                 and self.items < other.items)
     def __hash__(self):
-        self._hash = hash(tuple(self.items.iteritems()))
+        if self._hash is None:
+            self._hash = hash(tuple(self.items.iteritems()))
         return self._hash
     def __repr__(self):
         return "{" + ", ".join('%r: %r' % (key, self.items[key]) for key in sorted(self.items)) + "}"
@@ -994,7 +1003,8 @@ class Literal(object):
     def to_dot(self):
         return "%s(%s)".format(self.pred, ', '.join(a.to_dot() for a in self.args))
     def __hash__(self):
-        self._hash = hash((self.pred, self.args))
+        if self._hash is None:
+            self._hash = hash((self.pred, self.args))
         return self._hash
     def hashcons(self):
         """Returns the literal that is representative for the equivalence
@@ -1718,6 +1728,19 @@ def load(filedesc, *args, **kwargs):
     """
     return json.load(filedesc, object_hook=term_object_hook, *args, **kwargs)
 
+def iter_load(filedesc, *args, **kwargs):
+    """Yields the JSON values on the given file descriptor, one per line,
+    converted to term classes. Blank lines are skipped.
+
+    >>> from StringIO import StringIO
+    >>> f = StringIO('["claim", {"__IdConst": "p"}]\n\n[1, 2]\n')
+    >>> list(iter_load(f)) == [['claim', mk_idconst('p')], [1, 2]]
+    True
+    """
+    for line in filedesc:
+        if line.strip():
+            yield json.loads(line, object_hook=term_object_hook, *args, **kwargs)
+
 def loads(s, *args, **kwargs):
     """Converts a JSON string to term classes
 
@@ -23,9 +23,30 @@ import terms
 import copy
 import parser
 import logging
+from distutils.spawn import find_executable
 
 import pyparsing
 
+# name -> full path of the tools started by BatchTool.callTool
+_tool_paths = {}
+
+def tool_path(name):
+    """
+    Full path of the executable name, looked up in PATH once.  Starting
+    tools by full path, with close_fds=False and without preexec_fn,
+    lets Python 3.8+ use posix_spawn instead of fork and exec; under
+    Python 2 it saves the PATH search done by execvp in every child.
+    """
+    if os.sep in name:
+        return name
+    path = _tool_paths.get(name)
+    if path is None:
+        path = find_executable(name)
+        if path is None:
+            return name
+        _tool_paths[name] = path
+    return path
+
 class ArgSpec(object):
     """
     Defines the signature of predicates, as indicated in the argument
@@ -73,7 +94,13 @@ class ETBFS(object):
     def __init__(self, etb):
         self._etb = etb
 
-    def put_file(self, src, dst=None):
+    def put_file(self, src, dst=None, commit=True):
+        """
+        Put src in the git repository and return its fileref.  With
+        commit=False the file is only staged, which is cheaper for
+        intermediate files used on this node; it is committed with the
+        next file that is.
+        """
         self._etb.log.debug('put_file src = {0}: {1}, file_path = {2}'
                             .format(src, type(src),
                                     self._etb.config.etb_file_path))
@@ -99,7 +126,7 @@ class ETBFS(object):
                         src = nsrc
                 else:
                     src = os.path.abspath(src)
-        return terms.Map(self._etb.git.put(src, dst))
+        return terms.Map(self._etb.git.put(src, dst, commit))
 
 class Tool(object):
     """
@@ -108,7 +135,8 @@ class Tool(object):
     itself, annotated with @Tool.predicate(argspec).
 
     Calling the method should return a list of substitutions that are
-    answers to the goal, and bind all the variables in it.
+    answers to the goal, and bind all the variables in it.  Many answers
+    can also be returned lazily, as a generator of substitutions.
 
     the async() method should return False if the tool is very fast to
     call, True otherwise, in which case it is run in a background
@@ -190,13 +218,21 @@ class BatchTool(Tool) :
     """
 
     def callTool(self, *args, **kwargs) :
+        """
+        Run the command args, returning (returncode, stdout, stderr).
+        The string given as the input keyword, if any, is fed to the
+        standard input of the command.
+        """
         try :
-            p = subprocess.Popen(args,
+            stdin_data = kwargs.get('input', None)
+            p = subprocess.Popen((tool_path(args[0]),) + args[1:],
                                  shell=False,
+                                 close_fds=False,
+                                 stdin=None if stdin_data is None else subprocess.PIPE,
                                  stdout=subprocess.PIPE,
                                  stderr=subprocess.PIPE,
                                  env=kwargs.get('env', None))
-            (out, err) = p.communicate()
+            (out, err) = p.communicate(stdin_data)
             return (p.returncode, out, err)
         except Exception as msg:
             self.log.error(msg)
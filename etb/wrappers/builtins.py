@@ -3,11 +3,18 @@ from __future__ import division
 
 import uuid
 import time
+import weakref
 import logging
 import subprocess
 from etb import terms
 from etb.wrapper import Tool, Substitutions, Success, Failure, Errors
 
+# The empty list, bound by nil
+_NIL_TERM = terms.mk_term([])
+
+# tail -> head -> result of cons, holding neither tails nor results
+_CONS_CACHE = weakref.WeakKeyDictionary()
+
 class Builtins(Tool):
     """Some builtin predicates.
     >>> b = Builtins()
@@ -40,7 +47,7 @@ class Builtins(Tool):
         if a.is_var():
             subst = b.unify(a)
             return Failure(self) if subst is None else Substitutions(self, [subst])
-        elif a.val == b.val:
+        elif a is b or a.val == b.val:
             return Success(self) 
         else:
             return Failure(self) 
@@ -103,17 +110,25 @@ class Builtins(Tool):
     def nil(self, v):
         """Bind v to the empty list"""
         if v.is_var():
-            return Substitutions(self, [ self.bindResult(v, terms.mk_term([])) ])
+            return Substitutions(self, [ self.bindResult(v, _NIL_TERM) ])
         else:
             return Errors(self,  [ "nil passed a non variable: %s" % v ])
     
     @Tool.predicate("+head: value, +tail: value, -out: value")
     def cons(self, head, tail, out):
         """Create the cons of head to tail bound to variable out"""
-        if tail.is_const() and tail.val is None:
-            res = [head]
-        else:
-            res = [head.val] + list(tail.get_args())
+        conses = _CONS_CACHE.get(tail)
+        if conses is None:
+            conses = _CONS_CACHE[tail] = weakref.WeakValueDictionary()
+        res = conses.get(head)
+        if res is None:
+            if tail.is_const() and tail.val is None:
+                res = terms.mk_term([head])
+            else:
+                # The tail is already a tuple of terms: only the head
+                # needs converting.
+                res = terms.mk_array((terms.mk_term(head.val),) + tail.get_args())
+            conses[head] = res
         return Substitutions(self, [ self.bindResult(out, res)])
 
     @Tool.sync
@@ -4,6 +4,11 @@ from etb.wrapper import Tool, Substitutions, Lemmata, Success, Failure
 
 import etb.terms
 
+def _range_substs(result, low, up):
+    """The substitutions binding the variable result to each of low..up"""
+    return map(lambda i, r=result, mk=etb.terms.mk_numberconst: {r: mk(i)},
+               xrange(low, up+1))
+
 class Utils(Tool):
     """Library of util functions, without tool invocation"""
 
@@ -16,8 +21,7 @@ class Utils(Tool):
         if low > up:
             return Failure(self)
         if result.is_var():
-            return Substitutions(self, [self.bindResult(result, i) for i in range(low, up+1)])
-            #return Substitutions(self, [{result : etb.terms.mk_const(i)} for i in range(low, up+1)])
+            return Substitutions(self, _range_substs(result, low, up))
         else:
             result = int(result.val)
             if low <= result <= up:
@@ -33,8 +37,7 @@ class Utils(Tool):
             return Failure(self)
         if result.is_var():
             # result iterate from low to up
-            return Substitutions(self, [ self.bindResult(result, i) for i in range(low, up+1)])
-            #return Substitutions(self, [{result : etb.terms.mk_const(i)} for i in range(low, up+1)])
+            return Substitutions(self, _range_substs(result, low, up))
         else:
             result = int(result.get_val())
             if low <= result <= up: